@@ -1,12 +1,32 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import random
-import datetime
+import atexit
 import base64
+import bisect
+import contextlib
+import datetime
+import functools
+import hashlib
 import io
+import itertools
+import json
+import mmap
+import os
+import random
+import re
+import sqlite3
+import threading
 import time
-from gtts import gTTS
+import uuid
+import wave
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from pathlib import Path
+
+# pandas, numpy, gtts and multiprocessing are imported inside the code paths
+# that use them (stats, the engine index, TTS, batch plans), keeping them off
+# the cold-start path; `python tools/profile_startup.py` enforces the budget.
 
 # ==========================================
 # 1. CONFIGURATION & ASSETS
@@ -19,6 +39,38 @@ class AppConfig:
     ACCENT_COLOR = "#34C759" # Apple Health Green
     WARN_COLOR = "#FF9500"   # Apple Activity Orange
     ERROR_COLOR = "#FF3B30"  # Apple System Red
+
+    # Local storage (override with FITBOD_CACHE_DIR / FITBOD_TTS_ENGINE)
+    CACHE_DIR = Path(os.environ.get("FITBOD_CACHE_DIR", ".fitbod_cache"))
+    TTS_ENGINE = os.environ.get("FITBOD_TTS_ENGINE", "gtts")
+    TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    # "reference": audio served once via Streamlit's media store, page holds a URL.
+    # "inline": base64 data URI embedded in every render (legacy behaviour).
+    AUDIO_DELIVERY = os.environ.get("FITBOD_AUDIO_DELIVERY", "reference")
+    DATA_DIR = Path(os.environ.get("FITBOD_DATA_DIR", ".fitbod_data"))
+    # Optional directory holding exercises.jsonl / recipes.jsonl (see tools/export_catalog.py)
+    CATALOG_DIR = Path(os.environ["FITBOD_CATALOG_DIR"]) if os.environ.get("FITBOD_CATALOG_DIR") else None
+    SHOPPING_PAGE_SIZE = 50
+    # Library page: results per page and how many tag facets to offer
+    LIBRARY_PAGE_SIZE = 20
+    LIBRARY_TAG_FACETS = 12
+    # Bundled images (assets/recipes/<id>.jpg, see tools/fetch_recipe_images.py); resized copies go to CACHE_DIR/images
+    ASSETS_DIR = Path(os.environ.get("FITBOD_ASSETS_DIR", Path(__file__).resolve().parent / "assets"))
+    # Recipes without a bundled photo get generated artwork; FITBOD_REMOTE_IMAGES=1 links their `img` URL instead
+    REMOTE_IMAGES = os.environ.get("FITBOD_REMOTE_IMAGES", "0") == "1"
+    CONTENT_WIDTH_PX = 1200  # typical main column in the wide layout, used to pick image variants
+    # Stats chart: visible range -> days back (None = all time), downsampled to CHART_MAX_POINTS bars
+    STATS_RANGES = {"4 Weeks": 28, "6 Months": 182, "1 Year": 365, "All Time": None}
+    CHART_MAX_POINTS = 120
+    # Background TTS for the active plan: synthesis threads, and how often placeholders poll
+    TTS_PREFETCH_WORKERS = 4
+    AUDIO_POLL_SECONDS = 0.5
+    # Counters/latency histograms (see Metrics); also switchable from the ?debug=1 panel on Config
+    METRICS = os.environ.get("FITBOD_METRICS", "0") == "1"
+    # Plan optimizer: default session length and the choices offered on the dashboard (minutes)
+    SESSION_MINUTES = 15
+    SESSION_LENGTHS = [5, 10, 15, 20, 30, 45, 60]
+    WATER_GOAL_CUPS = 8
     
     @staticmethod
     def setup():
@@ -80,98 +132,2163 @@ class DataRepository:
         "Focus on what your body can do."
     ]
 
+    @staticmethod
+    def exercises():
+        """Exercise catalog: the external file in AppConfig.CATALOG_DIR if present, else the bundled list."""
+        return DataRepository._external("exercises.jsonl", ExerciseRecord) or DataRepository.EXERCISES
+
+    @staticmethod
+    def recipes():
+        """Recipe catalog: the external file in AppConfig.CATALOG_DIR if present, else the bundled list."""
+        return DataRepository._external("recipes.jsonl", RecipeRecord) or DataRepository.RECIPES
+
+    @staticmethod
+    def _external(filename, record_type):
+        if AppConfig.CATALOG_DIR is None:
+            return None
+        path = AppConfig.CATALOG_DIR / filename
+        if not path.exists():
+            return None
+        stat = path.stat()
+        return DataRepository._open_catalog(str(path), stat.st_mtime_ns, stat.st_size, record_type)
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False, max_entries=8)
+    def _open_catalog(path, mtime_ns, size, _record_type):
+        # Keyed on (path, mtime, size) so an edited file is re-opened.
+        return LazyCatalog(path, _record_type)
+
+    @staticmethod
+    def sponsor_matcher():
+        """Matcher over the SPONSORS keywords, compiled once per sponsor table."""
+        return DataRepository._compile_sponsors(tuple(DataRepository.SPONSORS))
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False, max_entries=4)
+    def _compile_sponsors(keywords):
+        return SponsorMatcher(keywords)
+
+    @staticmethod
+    def catalog_fingerprint():
+        """Identity of the exercise catalog, used to key derived indexes."""
+        catalog = DataRepository.exercises()
+        # Duck-typed: cached catalogs outlive the rerun that defined their class.
+        if hasattr(catalog, "fingerprint"):
+            return catalog.fingerprint
+        raw = json.dumps(catalog, sort_keys=True).encode()
+        return hashlib.sha1(raw).hexdigest()
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def user_store():
+        """Process-wide durable store for per-user activity."""
+        return SQLiteUserStore(AppConfig.DATA_DIR / "fitbod.db")
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def image_pipeline():
+        """Process-wide resizer for the bundled recipe images."""
+        return ImagePipeline(AppConfig.ASSETS_DIR / "recipes", AppConfig.CACHE_DIR / "images")
+
+    @staticmethod
+    def recipe_image(recipe, columns=1):
+        """Image for `recipe` sized for a grid of `columns` columns.
+
+        A bundled photo is served as a resized local file; without one the
+        recipe gets generated artwork, so cards render offline. With
+        AppConfig.REMOTE_IMAGES the recipe's own `img` URL is used instead.
+        """
+        pipeline = DataRepository.image_pipeline()
+        url = recipe.get('img') or ""
+        if (AppConfig.REMOTE_IMAGES and pipeline.source_file(recipe['id']) is None
+                and url.startswith(("http://", "https://"))):
+            return url
+        variant = ImagePipeline.variant_for(AppConfig.CONTENT_WIDTH_PX // columns)
+        return pipeline.variant(recipe['id'], variant, title=recipe['title'])
+
+
+class CatalogRecord:
+    """Compact read-only catalog entry (`__slots__`, no per-instance dict).
+
+    Supports the same `rec['field']` / `rec.get()` access as the bundled
+    dict entries, so views don't care where a catalog came from.
+    """
+    __slots__ = ()
+    SEQUENCES = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            value = fields.get(name)
+            setattr(self, name, tuple(value) if name in self.SEQUENCES and value is not None else value)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.get('id')!r})"
+
+
+class ExerciseRecord(CatalogRecord):
+    __slots__ = ("id", "title", "cat", "tags", "mins", "cal", "ins")
+    SEQUENCES = ("tags", "ins")
+
+
+class RecipeRecord(CatalogRecord):
+    __slots__ = ("id", "title", "price", "img", "desc", "ing")
+    SEQUENCES = ("ing",)
+
+
+class LazyCatalog(Sequence):
+    """Read-only sequence over a JSONL catalog file.
+
+    The file is memory-mapped and only the start offset of each line is kept
+    (8 bytes per entry); records are parsed into `record_type` on access.
+    """
+
+    def __init__(self, path, record_type):
+        self.path = Path(path)
+        self.record_type = record_type
+        stat = self.path.stat()
+        self.fingerprint = f"{self.path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        self._offsets = array('Q')
+        self._mm = None
+        if stat.st_size:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            pos, end = 0, len(self._mm)
+            while pos < end:
+                nl = self._mm.find(b"\n", pos)
+                nl = end if nl == -1 else nl
+                if nl - pos > 1:  # skip blank lines
+                    self._offsets.append(pos)
+                pos = nl + 1
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start = self._offsets[i]
+        end = self._mm.find(b"\n", start)
+        raw = self._mm[start:end if end != -1 else len(self._mm)]
+        return self.record_type(**json.loads(raw))
+
+    def __reduce__(self):
+        # Re-open by path (e.g. in process-pool workers) instead of pickling the map.
+        return (LazyCatalog, (str(self.path), self.record_type))
+
+
+class SponsorMatcher:
+    """Aho-Corasick automaton over sponsor keywords.
+
+    `matches(text)` finds every keyword occurring in `text` (the same
+    case-sensitive substring test as `key in text`) in a single pass,
+    independent of how many keywords are registered.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for k, word in enumerate(self.keywords):
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(k)
+
+        # Breadth-first failure links; each node inherits its fallback's outputs.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text):
+        """Keywords found in `text`, in registration order."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])  # only non-empty if "" is a keyword
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return [self.keywords[k] for k in sorted(found)]
+
+
+class ShoppingItem:
+    __slots__ = ("name", "qty", "sources")
+
+    def __init__(self, name, qty=0, sources=()):
+        self.name = name
+        self.qty = qty
+        self.sources = list(sources)
+
+
+class ShoppingList:
+    """Ordered, hash-indexed shopping list.
+
+    Backed by a dict (insertion-ordered), so add/remove/lookup are O(1) and
+    iteration follows the order items were first added. Adding an existing
+    ingredient bumps its quantity and records the recipe it came from.
+    """
+
+    def __init__(self, items=()):
+        self._items = {item.name: item for item in items}
+
+    def add(self, name, qty=1, source=None):
+        entry = self._items.get(name)
+        if entry is None:
+            entry = self._items[name] = ShoppingItem(name)
+        entry.qty += qty
+        if source is not None and source not in entry.sources:
+            entry.sources.append(source)
+        return entry
+
+    def add_recipe(self, recipe):
+        for ing in recipe['ing']:
+            self.add(ing, source=recipe['id'])
+
+    def add_recipes(self, recipes):
+        """Bulk-adds a recipe set, aggregating shared ingredients."""
+        for recipe in recipes:
+            self.add_recipe(recipe)
+
+    def remove(self, name):
+        return self._items.pop(name, None)
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+
+class ImagePipeline:
+    """Resized local copies of catalog images; never touches the network.
+
+    The source is a bundled file (`<source_dir>/<name>.jpg|.png|.webp`) or,
+    when none is bundled, generated artwork (DataRepository.recipe_image
+    prefers the recipe's remote URL to the artwork). Each size variant is written once
+    to `cache_dir` as `<name>-<variant>-<content hash>.jpg`, so an edited
+    asset gets a fresh file and stale variants are simply never read again.
+    """
+
+    VARIANTS = {"thumb": 160, "card": 640, "hero": 1280}  # width in px, 4:3
+    SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+    PLACEHOLDER_VERSION = "1"
+    PALETTE = ["#007AFF", "#34C759", "#FF9500", "#AF52DE", "#5AC8FA", "#FF2D55"]
+
+    def __init__(self, source_dir, cache_dir, quality=82):
+        self.source_dir = Path(source_dir)
+        self.cache_dir = Path(cache_dir)
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._paths = {}  # (name, source signature, variant) -> output path
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def variant_for(width_px):
+        """Smallest variant at least `width_px` wide (the largest if none is)."""
+        fitting = [name for name, width in ImagePipeline.VARIANTS.items() if width >= width_px]
+        return min(fitting, key=ImagePipeline.VARIANTS.get) if fitting else max(ImagePipeline.VARIANTS, key=ImagePipeline.VARIANTS.get)
+
+    def source_file(self, name):
+        for suffix in self.SUFFIXES:
+            path = self.source_dir / f"{name}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def variant(self, name, variant="card", title=""):
+        """Path of `name` resized to `variant`, rendering it on first use."""
+        width = self.VARIANTS[variant]
+        source = self.source_file(name)
+        if source is not None:
+            stat = source.stat()
+            signature = (str(source), stat.st_mtime_ns, stat.st_size)
+        else:
+            signature = ("placeholder", self.PLACEHOLDER_VERSION, title)
+        memo_key = (name, signature, variant)
+        path = self._paths.get(memo_key)
+        if path is not None:
+            return path
+
+        raw = source.read_bytes() if source is not None else "\0".join(signature).encode()
+        digest = hashlib.sha256(raw + f"\0{width}\0{self.quality}".encode()).hexdigest()[:16]
+        path = self.cache_dir / f"{name}-{variant}-{digest}.jpg"
+        if not path.exists():
+            with Metrics.registry().timer("fitbod_image_render_seconds", variant=variant):
+                image = self._resize(source, width) if source is not None else self._placeholder(name, title, width)
+                tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+                image.save(tmp, "JPEG", quality=self.quality, optimize=True, progressive=True)
+                os.replace(tmp, path)
+        with self._lock:
+            self._paths[memo_key] = path
+        return path
+
+    @staticmethod
+    def _resize(source, width):
+        from PIL import Image, ImageOps
+        with Image.open(source) as image:
+            return ImageOps.fit(image.convert("RGB"), (width, width * 3 // 4), Image.Resampling.LANCZOS)
+
+    def _placeholder(self, name, title, width):
+        """Offline artwork: a diagonal gradient in a palette colour with the title."""
+        from PIL import Image, ImageColor, ImageDraw, ImageFont
+        height = width * 3 // 4
+        accent = ImageColor.getrgb(self.PALETTE[int(hashlib.sha1(name.encode()).hexdigest(), 16) % len(self.PALETTE)])
+        # Rotated 256px ramp, cropped to the inscribed square so no corner is left unfilled
+        ramp = Image.linear_gradient("L").rotate(45, expand=True)
+        inset = (ramp.width - 181) // 2
+        gradient = ramp.crop((inset, inset, inset + 181, inset + 181)).resize((width, height))
+        image = Image.composite(Image.new("RGB", (width, height), accent),
+                                Image.new("RGB", (width, height), (245, 245, 247)), gradient)
+        if title:
+            draw = ImageDraw.Draw(image)
+            try:
+                font = ImageFont.load_default(size=max(12, width // 14))
+            except TypeError:  # Pillow < 10.1 has a single fixed-size bitmap font
+                font = ImageFont.load_default()
+            draw.text((width / 2, height / 2), title, fill="white", font=font, anchor="mm",
+                      stroke_width=max(1, width // 320), stroke_fill=(0, 0, 0))
+        return image
+
+
+class UserStore(ABC):
+    """Repository interface for per-user activity: workouts, water, journal, purchases.
+
+    Activity is an append-only event log (workouts, water, journal entries);
+    per-day/per-week aggregates and the streak are updated with every
+    appended event, so dashboard figures never rescan history. Writes are
+    appends/upserts (no read-modify-write of Python lists) and every
+    list-shaped read is paginated with `limit` / `offset`. Implementations
+    must provide every abstract method; `flush` is a no-op unless writes are
+    buffered.
+    """
+
+    @abstractmethod
+    def log_workout(self, user, date, minutes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def workout_count(self, user):
+        raise NotImplementedError
+
+    @abstractmethod
+    def history(self, user, limit=100, offset=0):
+        """Newest-first page of {"date", "minutes"} entries."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def rollups(self, user, start=None, grain="day"):
+        """Oldest-first (period start, minutes, sessions) totals per day, week or month since `start`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def first_workout_date(self, user):
+        raise NotImplementedError
+
+    @abstractmethod
+    def streaks(self, user, today=None):
+        """{"current", "longest"} runs of consecutive workout days."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def day_totals(self, user, date):
+        """{"minutes", "sessions", "cups", "entries"} logged on `date`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def week_totals(self, user, date):
+        """{"minutes", "sessions", "cups", "entries"} for the Monday-based week containing `date`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def log_water(self, user, date, cups=1):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_journal_entry(self, user, date, text):
+        raise NotImplementedError
+
+    @abstractmethod
+    def journal(self, user, limit=100, offset=0):
+        """Newest-first page of {"date", "text"} entries."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_records(self, user, chunk_size=10_000):
+        """Yields (kind, [(date, value, text), ...]) chunks of the user's history, oldest first.
+
+        Kinds are "workout" (value = minutes), "water" (value = cups) and
+        "journal" (text). Each chunk is a separate short read, so writers are
+        never blocked for a whole export.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def import_records(self, user, kind, rows):
+        """Appends (date, value, text) rows of one kind, as `iter_records` yields them."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_purchases(self, user, recipes):
+        """Records recipe purchases and merges their ingredients into the shopping list."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_shopping_items(self, user, names):
+        raise NotImplementedError
+
+    @abstractmethod
+    def inventory(self, user):
+        raise NotImplementedError
+
+    @abstractmethod
+    def shopping_list(self, user, limit=100, offset=0):
+        """Page of the shopping list (a ShoppingList) in insertion order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def shopping_count(self, user):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_profile(self, user, profile):
+        """Stores the onboarding answers (name, disability, goal, exp) under the profile id `user`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def profile(self, user):
+        """The saved profile dict (with its "id"), or None for an unknown id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_history(self, user):
+        """Deletes the user's workouts, water log and journal (and their aggregates)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_user(self, user):
+        raise NotImplementedError
+
+    @abstractmethod
+    def transaction(self):
+        """Context manager: writes inside it are committed together, or not at all if it raises."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persists any buffered writes."""
+
+
+class SQLiteUserStore(UserStore):
+    """UserStore on SQLite in WAL mode.
+
+    Writes are buffered and committed in batches (one transaction, executemany
+    per statement) once `batch_size` accumulate or `flush_interval` seconds
+    pass; reads flush first so callers always see their own writes. SQL is
+    kept to a fixed set of parameterized statements, which sqlite3 keeps
+    prepared in its statement cache.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            date TEXT NOT NULL,
+            minutes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS workouts_user_date ON workouts (user, date);
+        CREATE TABLE IF NOT EXISTS inventory (
+            user TEXT NOT NULL,
+            recipe_id TEXT NOT NULL,
+            PRIMARY KEY (user, recipe_id)
+        );
+        CREATE TABLE IF NOT EXISTS shopping_items (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            item TEXT NOT NULL,
+            qty INTEGER NOT NULL DEFAULT 1,
+            sources TEXT NOT NULL DEFAULT '',
+            UNIQUE (user, item)
+        );
+        CREATE INDEX IF NOT EXISTS shopping_items_user_id ON shopping_items (user, id);
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            user TEXT NOT NULL,
+            date TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            cups INTEGER NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user, date)
+        );
+        CREATE TABLE IF NOT EXISTS weekly_rollups (
+            user TEXT NOT NULL,
+            week TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            cups INTEGER NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user, week)
+        );
+        CREATE TABLE IF NOT EXISTS streaks (
+            user TEXT PRIMARY KEY,
+            last_date TEXT NOT NULL,
+            current INTEGER NOT NULL,
+            longest INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS water_log (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            date TEXT NOT NULL,
+            cups INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS water_log_user_id ON water_log (user, id);
+        CREATE TABLE IF NOT EXISTS journal (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            date TEXT NOT NULL,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS journal_user_id ON journal (user, id);
+        CREATE TABLE IF NOT EXISTS profiles (
+            user TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    INSERT_WORKOUT = "INSERT INTO workouts (user, date, minutes) VALUES (?, ?, ?)"
+    INSERT_INVENTORY = "INSERT OR IGNORE INTO inventory (user, recipe_id) VALUES (?, ?)"
+    ADD_SHOPPING = ("INSERT INTO shopping_items (user, item, qty, sources) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (user, item) DO UPDATE SET qty = qty + excluded.qty, "
+                    "sources = CASE WHEN sources = '' THEN excluded.sources ELSE sources || ',' || excluded.sources END")
+    DELETE_SHOPPING = "DELETE FROM shopping_items WHERE user = ? AND item = ?"
+    INSERT_WATER = "INSERT INTO water_log (user, date, cups) VALUES (?, ?, ?)"
+    INSERT_JOURNAL = "INSERT INTO journal (user, date, text) VALUES (?, ?, ?)"
+    SAVE_PROFILE = "INSERT INTO profiles (user, data) VALUES (?, ?) ON CONFLICT (user) DO UPDATE SET data = excluded.data"
+    # kind -> keyset-paginated read of (id, date, value, text) for iter_records
+    RECORD_QUERIES = {
+        "workout": "SELECT id, date, minutes, NULL FROM workouts WHERE user = ? AND id > ? ORDER BY id LIMIT ?",
+        "water": "SELECT id, date, cups, NULL FROM water_log WHERE user = ? AND id > ? ORDER BY id LIMIT ?",
+        "journal": "SELECT id, date, NULL, text FROM journal WHERE user = ? AND id > ? ORDER BY id LIMIT ?",
+    }
+    # Rollups are maintained incrementally alongside every appended event.
+    # Each takes the summed value and the number of events it covers.
+    ADD_DAILY = ("INSERT INTO daily_rollups (user, date, minutes, sessions) VALUES (?, ?, ?, ?) "
+                 "ON CONFLICT (user, date) DO UPDATE SET minutes = minutes + excluded.minutes, "
+                 "sessions = sessions + excluded.sessions")
+    ADD_WEEKLY = ("INSERT INTO weekly_rollups (user, week, minutes, sessions) VALUES (?, ?, ?, ?) "
+                  "ON CONFLICT (user, week) DO UPDATE SET minutes = minutes + excluded.minutes, "
+                  "sessions = sessions + excluded.sessions")
+    ADD_DAILY_WATER = ("INSERT INTO daily_rollups (user, date, minutes, sessions, cups) VALUES (?, ?, 0, 0, ?) "
+                       "ON CONFLICT (user, date) DO UPDATE SET cups = cups + excluded.cups")
+    ADD_WEEKLY_WATER = ("INSERT INTO weekly_rollups (user, week, minutes, sessions, cups) VALUES (?, ?, 0, 0, ?) "
+                        "ON CONFLICT (user, week) DO UPDATE SET cups = cups + excluded.cups")
+    ADD_DAILY_ENTRY = ("INSERT INTO daily_rollups (user, date, minutes, sessions, entries) VALUES (?, ?, 0, 0, ?) "
+                       "ON CONFLICT (user, date) DO UPDATE SET entries = entries + excluded.entries")
+    ADD_WEEKLY_ENTRY = ("INSERT INTO weekly_rollups (user, week, minutes, sessions, entries) VALUES (?, ?, 0, 0, ?) "
+                        "ON CONFLICT (user, week) DO UPDATE SET entries = entries + excluded.entries")
+    # Extends the run when the new day follows the last one; a later gap restarts it;
+    # same-day or back-dated entries leave it unchanged.
+    _NEXT_RUN = ("CASE WHEN excluded.last_date = date(last_date, '+1 day') THEN current + 1 "
+                 "WHEN excluded.last_date > last_date THEN 1 ELSE current END")
+    ADD_STREAK = ("INSERT INTO streaks (user, last_date, current, longest) VALUES (?, ?, 1, 1) "
+                  f"ON CONFLICT (user) DO UPDATE SET current = {_NEXT_RUN}, longest = max(longest, {_NEXT_RUN}), "
+                  "last_date = max(last_date, excluded.last_date)")
+    # A back-dated day can join or bridge runs ADD_STREAK has already counted, so when
+    # the streak's last_date is past the given day the user's runs are recounted from
+    # daily_rollups (gaps and islands: consecutive days share julianday - row number).
+    # The recount only runs for a matching row, so an in-order event costs one index probe.
+    # Params: user, day. Runs after all of the batch's other writes (see _flush).
+    RECOUNT_STREAK = (
+        "UPDATE streaks SET (current, longest) = ("
+        "WITH days AS (SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS run "
+        "FROM daily_rollups WHERE user = ?1 AND sessions > 0), "
+        "runs AS (SELECT COUNT(*) AS length, MAX(date) AS last FROM days GROUP BY run) "
+        "SELECT (SELECT length FROM runs ORDER BY last DESC LIMIT 1), MAX(length) FROM runs) "
+        "WHERE user = ?1 AND last_date > ?2")
+
+    def __init__(self, path, batch_size=64, flush_interval=1.0):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        stale = self._migrate()
+        self._lock = threading.RLock()
+        self._pending = []
+        self._oldest = None
+        self._in_transaction = False
+        if stale or not self._conn.execute("SELECT 1 FROM daily_rollups LIMIT 1").fetchone():
+            self.rebuild_rollups()
+        atexit.register(self.flush)
+
+    def _migrate(self):
+        """Upgrades older databases in place; True when the rollups must be rebuilt."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(shopping_items)")}
+        if "qty" not in columns:
+            self._conn.execute("ALTER TABLE shopping_items ADD COLUMN qty INTEGER NOT NULL DEFAULT 1")
+            self._conn.execute("ALTER TABLE shopping_items ADD COLUMN sources TEXT NOT NULL DEFAULT ''")
+        # Click-count streaks and undated hydration totals, superseded by the activity logs
+        self._conn.execute("DROP TABLE IF EXISTS counters")
+        stale = False
+        for table in ("daily_rollups", "weekly_rollups"):
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "cups" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN cups INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN entries INTEGER NOT NULL DEFAULT 0")
+                stale = True
+        return stale
+
+    # --- write path ---
+
+    _TABLES = {}
+
+    @staticmethod
+    def _table(sql):
+        table = SQLiteUserStore._TABLES.get(sql)
+        if table is None:
+            # The written table, not one a WITH clause reads from
+            table = SQLiteUserStore._TABLES[sql] = re.search(r"(?:(?:INSERT|UPDATE)(?: OR \w+)?(?: INTO)?|DELETE FROM)\s+(\w+)", sql).group(1)
+        return table
+
+    def _write(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending, self._oldest = self._pending, [], None
+        # A stable sort by table keeps each table's write order while lining up
+        # runs of one statement for executemany. Streak recounts read the other
+        # tables' results, so they run last: once per user, from their earliest day.
+        recounts = {}
+        for sql, (user, day) in (w for w in pending if w[0] == self.RECOUNT_STREAK):
+            recounts[user] = min(day, recounts.get(user, day))
+        pending = [w for w in pending if w[0] != self.RECOUNT_STREAK]
+        pending.sort(key=lambda w: self._table(w[0]))
+        pending += [(self.RECOUNT_STREAK, params) for params in recounts.items()]
+        with self.transaction():
+            for sql, group in itertools.groupby(pending, key=lambda w: w[0]):
+                self._conn.executemany(sql, [params for _, params in group])
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """One SQLite transaction around the block; nested uses join the outer one.
+
+        Holds the store lock throughout, so other sessions' writes wait rather
+        than land inside it. On an exception the buffered writes made inside
+        are dropped along with everything already executed.
+        """
+        with self._lock:
+            if self._in_transaction:
+                yield
+                return
+            self._flush()
+            self._conn.execute("BEGIN")
+            self._in_transaction = True
+            try:
+                yield
+                self._flush()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._pending, self._oldest = [], None
+                self._conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._in_transaction = False
+
+    def _read(self, sql, params):
+        with self._lock:
+            self._flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- repository API ---
+
+    def _rollup_writes(self, user, kind, date, value=None, count=1):
+        """Aggregate upserts for `count` events of one kind on one day (summing to `value`).
+
+        O(1) work per appended event, whatever the length of the history.
+        """
+        day = date.isoformat()
+        week = (date - datetime.timedelta(days=date.weekday())).isoformat()
+        if kind == "workout":
+            return [(self.ADD_DAILY, (user, day, value, count)), (self.ADD_WEEKLY, (user, week, value, count)),
+                    (self.ADD_STREAK, (user, day)), (self.RECOUNT_STREAK, (user, day))]
+        if kind == "water":
+            return [(self.ADD_DAILY_WATER, (user, day, value)), (self.ADD_WEEKLY_WATER, (user, week, value))]
+        return [(self.ADD_DAILY_ENTRY, (user, day, count)), (self.ADD_WEEKLY_ENTRY, (user, week, count))]
+
+    def _day_rollup_writes(self, user, kind, days):
+        """Aggregate upserts for date-ordered (date string, value) events, one set per distinct day."""
+        totals = {}
+        for day, value in days:
+            total, count = totals.get(day, (0, 0))
+            totals[day] = (total + (value or 0), count + 1)
+        return [w for day, (total, count) in totals.items()
+                for w in self._rollup_writes(user, kind, datetime.date.fromisoformat(day), total, count)]
+
+    def log_workout(self, user, date, minutes):
+        self._write(self.INSERT_WORKOUT, (user, date.isoformat(), minutes))
+        for sql, params in self._rollup_writes(user, "workout", date, minutes):
+            self._write(sql, params)
+
+    # kind -> the event log summed per (user, date) in replay order, for rebuild_rollups
+    REPLAY_QUERIES = {
+        "workout": "SELECT user, date, SUM(minutes), COUNT(*) FROM workouts GROUP BY user, date ORDER BY user, date",
+        "water": "SELECT user, date, SUM(cups), COUNT(*) FROM water_log GROUP BY user, date ORDER BY user, date",
+        "journal": "SELECT user, date, NULL, COUNT(*) FROM journal GROUP BY user, date ORDER BY user, date",
+    }
+
+    def rebuild_rollups(self):
+        """Recomputes every rollup by replaying the event logs (migration/repair)."""
+        with self.transaction():
+            for table in ("daily_rollups", "weekly_rollups", "streaks"):
+                self._conn.execute(f"DELETE FROM {table}")
+            for kind, sql in self.REPLAY_QUERIES.items():
+                rows = self._conn.execute(sql).fetchall()
+                self._pending = [w for u, d, v, n in rows
+                                 for w in self._rollup_writes(u, kind, datetime.date.fromisoformat(d), v, n)]
+                self._flush()
+
+    def rollups(self, user, start=None, grain="day"):
+        # Periods with only water/journal events have no workout to chart
+        start = start or datetime.date.min
+        since = start.isoformat()
+        if grain == "week":
+            # Weeks are keyed by their Monday: keep the week `start` falls in
+            since = (start - datetime.timedelta(days=start.weekday())).isoformat()
+            sql = ("SELECT week, minutes, sessions FROM weekly_rollups "
+                   "WHERE user = ? AND week >= ? AND sessions > 0 ORDER BY week")
+        elif grain == "month":
+            sql = ("SELECT substr(date, 1, 7) || '-01', SUM(minutes), SUM(sessions) FROM daily_rollups "
+                   "WHERE user = ? AND date >= ? AND sessions > 0 GROUP BY substr(date, 1, 7) ORDER BY 1")
+        else:
+            sql = ("SELECT date, minutes, sessions FROM daily_rollups "
+                   "WHERE user = ? AND date >= ? AND sessions > 0 ORDER BY date")
+        return [(datetime.date.fromisoformat(d), m, n) for d, m, n in self._read(sql, (user, since))]
+
+    def first_workout_date(self, user):
+        (day,), = self._read("SELECT MIN(date) FROM daily_rollups WHERE user = ? AND sessions > 0", (user,))
+        return datetime.date.fromisoformat(day) if day else None
+
+    _NO_TOTALS = (0, 0, 0, 0)
+
+    def day_totals(self, user, date):
+        rows = self._read("SELECT minutes, sessions, cups, entries FROM daily_rollups WHERE user = ? AND date = ?",
+                          (user, date.isoformat()))
+        return dict(zip(("minutes", "sessions", "cups", "entries"), rows[0] if rows else self._NO_TOTALS))
+
+    def week_totals(self, user, date):
+        week = (date - datetime.timedelta(days=date.weekday())).isoformat()
+        rows = self._read("SELECT minutes, sessions, cups, entries FROM weekly_rollups WHERE user = ? AND week = ?",
+                          (user, week))
+        return dict(zip(("minutes", "sessions", "cups", "entries"), rows[0] if rows else self._NO_TOTALS))
+
+    def streaks(self, user, today=None):
+        rows = self._read("SELECT last_date, current, longest FROM streaks WHERE user = ?", (user,))
+        if not rows:
+            return {"current": 0, "longest": 0}
+        last, current, longest = rows[0]
+        today = today or datetime.date.today()
+        alive = (today - datetime.date.fromisoformat(last)).days <= 1
+        return {"current": current if alive else 0, "longest": longest}
+
+    def workout_count(self, user):
+        return self._read("SELECT COUNT(*) FROM workouts WHERE user = ?", (user,))[0][0]
+
+    def history(self, user, limit=100, offset=0):
+        rows = self._read("SELECT date, minutes FROM workouts WHERE user = ? ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+                          (user, limit, offset))
+        return [{"date": datetime.date.fromisoformat(d), "minutes": m} for d, m in rows]
+
+    def log_water(self, user, date, cups=1):
+        self._write(self.INSERT_WATER, (user, date.isoformat(), cups))
+        for sql, params in self._rollup_writes(user, "water", date, cups):
+            self._write(sql, params)
+
+    def add_journal_entry(self, user, date, text):
+        self._write(self.INSERT_JOURNAL, (user, date.isoformat(), text))
+        for sql, params in self._rollup_writes(user, "journal", date):
+            self._write(sql, params)
+
+    def journal(self, user, limit=100, offset=0):
+        rows = self._read("SELECT date, text FROM journal WHERE user = ? ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+                          (user, limit, offset))
+        return [{"date": datetime.date.fromisoformat(d), "text": t} for d, t in rows]
+
+    def iter_records(self, user, chunk_size=10_000):
+        for kind, sql in self.RECORD_QUERIES.items():
+            last = 0
+            while True:
+                rows = self._read(sql, (user, last, chunk_size))
+                if not rows:
+                    break
+                last = rows[-1][0]
+                yield kind, [row[1:] for row in rows]
+
+    def import_records(self, user, kind, rows):
+        rows = sorted(rows, key=lambda row: row[0])  # ISO dates: oldest first
+        if kind == "workout":
+            appends = [(self.INSERT_WORKOUT, (user, day, minutes)) for day, minutes, _ in rows]
+        elif kind == "water":
+            appends = [(self.INSERT_WATER, (user, day, cups)) for day, cups, _ in rows]
+        elif kind == "journal":
+            appends = [(self.INSERT_JOURNAL, (user, day, text)) for day, _, text in rows]
+        else:
+            raise ValueError(f"unknown record kind: {kind!r}")
+        # One transaction per chunk, batched by statement like any other flush; the
+        # aggregates take one upsert per distinct day rather than one per row, and
+        # date order keeps the streak's incremental update exact within the chunk
+        with self._lock:
+            self._pending.extend(appends)
+            self._pending.extend(self._day_rollup_writes(user, kind, ((day, value) for day, value, _ in rows)))
+            self._flush()
+
+    def add_purchases(self, user, recipes):
+        batch = ShoppingList()
+        batch.add_recipes(recipes)
+        for recipe in recipes:
+            self._write(self.INSERT_INVENTORY, (user, recipe['id']))
+        # One upsert per distinct ingredient, however many recipes share it.
+        for entry in batch:
+            self._write(self.ADD_SHOPPING, (user, entry.name, entry.qty, ",".join(entry.sources)))
+
+    def remove_shopping_items(self, user, names):
+        for name in names:
+            self._write(self.DELETE_SHOPPING, (user, name))
+
+    def inventory(self, user):
+        return {r for (r,) in self._read("SELECT recipe_id FROM inventory WHERE user = ?", (user,))}
+
+    def shopping_list(self, user, limit=100, offset=0):
+        rows = self._read("SELECT item, qty, sources FROM shopping_items WHERE user = ? ORDER BY id LIMIT ? OFFSET ?",
+                          (user, limit, offset))
+        return ShoppingList(ShoppingItem(item, qty, dict.fromkeys(filter(None, sources.split(",")))) for item, qty, sources in rows)
+
+    def shopping_count(self, user):
+        return self._read("SELECT COUNT(*) FROM shopping_items WHERE user = ?", (user,))[0][0]
+
+    def save_profile(self, user, profile):
+        self._write(self.SAVE_PROFILE, (user, json.dumps({k: v for k, v in profile.items() if k != "id"})))
+
+    def profile(self, user):
+        rows = self._read("SELECT data FROM profiles WHERE user = ?", (user,))
+        return {"id": user, **json.loads(rows[0][0])} if rows else None
+
+    HISTORY_TABLES = ("workouts", "water_log", "journal", "daily_rollups", "weekly_rollups", "streaks")
+
+    def delete_history(self, user):
+        self._delete(user, self.HISTORY_TABLES)
+
+    def delete_user(self, user):
+        self._delete(user, self.HISTORY_TABLES + ("inventory", "shopping_items", "profiles"))
+
+    def _delete(self, user, tables):
+        with self.transaction():
+            for table in tables:
+                self._conn.execute(f"DELETE FROM {table} WHERE user = ?", (user,))
+
+
+class HistoryArchive:
+    """Parquet backups of a user's workouts, water log and journal.
+
+    One long table (kind, date, value, text): every `UserStore.iter_records`
+    chunk is written as its own row group, and a restore reads batches back
+    and appends them chunk by chunk, so memory is bounded by `chunk_rows`
+    however many years the history covers. pyarrow ships with Streamlit and
+    is imported on use.
+    """
+
+    FORMAT = "fitbod-history/1"
+    KINDS = ("workout", "water", "journal")
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+        return pa.schema([
+            ("kind", pa.dictionary(pa.int8(), pa.string())),
+            ("date", pa.date32()),
+            ("value", pa.int32()),
+            ("text", pa.string()),
+        ], metadata={"format": HistoryArchive.FORMAT})
+
+    @staticmethod
+    def export(store, user, sink, chunk_rows=10_000):
+        """Writes the user's history to `sink` (a path or binary file); returns rows written per kind."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = HistoryArchive.schema()
+        kinds = pa.array(HistoryArchive.KINDS)
+        counts = dict.fromkeys(HistoryArchive.KINDS, 0)
+        with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+            for kind, rows in store.iter_records(user, chunk_rows):
+                dates, values, texts = zip(*rows)
+                code = pa.array([HistoryArchive.KINDS.index(kind)] * len(rows), pa.int8())
+                writer.write_batch(pa.record_batch([
+                    pa.DictionaryArray.from_arrays(code, kinds),
+                    pa.array(dates, pa.string()).cast(pa.date32()),
+                    pa.array(values, pa.int32()),
+                    pa.array(texts, pa.string()),
+                ], schema=schema))
+                counts[kind] += len(rows)
+        return counts
+
+    @staticmethod
+    def restore(store, user, source, chunk_rows=10_000, replace=False):
+        """Appends the history in `source` (a path or binary file) to `user`; returns rows read per kind.
+
+        With `replace`, the user's existing history is deleted first (only
+        once the file is known to be an archive), so restoring the same
+        backup twice doesn't duplicate it. The delete and every chunk share
+        one store transaction: a file that turns out to be truncated or
+        corrupt partway through leaves the history as it was. Raises
+        ValueError for files that aren't history archives, and OSError or
+        pyarrow.ArrowException for unreadable ones.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        archive = pq.ParquetFile(source)
+        if (archive.schema_arrow.metadata or {}).get(b"format") != HistoryArchive.FORMAT.encode():
+            raise ValueError("not a FitBod history archive")
+        counts = dict.fromkeys(HistoryArchive.KINDS, 0)
+        with store.transaction():
+            if replace:
+                store.delete_history(user)
+            for batch in archive.iter_batches(batch_size=chunk_rows):
+                kinds = batch.column("kind").cast(pa.string()).to_pylist()
+                rows = zip(batch.column("date").cast(pa.string()).to_pylist(),
+                           batch.column("value").to_pylist(), batch.column("text").to_pylist())
+                by_kind = {}
+                for kind, row in zip(kinds, rows):
+                    by_kind.setdefault(kind, []).append(row)
+                for kind, rows in by_kind.items():
+                    store.import_records(user, kind, rows)
+                    counts[kind] = counts.get(kind, 0) + len(rows)
+        return counts
+
 # ==========================================
 # 3. LOGIC ENGINE
 # ==========================================
 
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms with Prometheus text / JSON export.
+
+    Every recording method returns immediately while `enabled` is False, so
+    instrumented code paths cost one attribute check when metrics are off.
+    """
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    NULL_TIMER = contextlib.nullcontext()
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [per-bucket counts (+Inf last), sum]
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        slot = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(self.BUCKETS) + 1), 0.0]
+            hist[0][slot] += 1
+            hist[1] += seconds
+
+    def timer(self, name, **labels):
+        """Context manager recording the block's latency (and escaping errors) under `name`."""
+        if not self.enabled:
+            return self.NULL_TIMER
+        return MetricsTimer(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _quantile(self, counts, q):
+        # Upper bound of the bucket holding the q-th observation (None when it is past the last bound)
+        rank, seen = q * sum(counts), 0
+        for bound, count in zip(self.BUCKETS, counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        """JSON-ready dump: counters plus histograms with cumulative buckets and p50/p95/p99 bounds."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(counts), total)) for key, (counts, total) in self._histograms.items())
+        return {
+            "enabled": self.enabled,
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in counters],
+            "histograms": [{
+                "name": name,
+                "labels": dict(labels),
+                "count": sum(counts),
+                "sum": round(total, 6),
+                "buckets": dict(zip([*map(str, self.BUCKETS), "+Inf"], itertools.accumulate(counts))),
+                **{f"p{round(q * 100)}": self._quantile(counts, q) for q in (0.5, 0.95, 0.99)},
+            } for (name, labels), (counts, total) in histograms],
+        }
+
+    @staticmethod
+    def _labels(labels, **extra):
+        pairs = [*labels.items(), *extra.items()]
+        if not pairs:
+            return ""
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap, lines, typed = self.snapshot(), [], set()
+        for kind, entries in (("counter", snap["counters"]), ("histogram", snap["histograms"])):
+            for entry in entries:
+                name, labels = entry["name"], entry["labels"]
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    lines.append(f"{name}{self._labels(labels)} {entry['value']}")
+                    continue
+                for bound, count in entry["buckets"].items():
+                    lines.append(f"{name}_bucket{self._labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {entry['sum']}")
+                lines.append(f"{name}_count{self._labels(labels)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsTimer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry, self.name, self.labels = registry, name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        # st.rerun()/st.stop() unwind with BaseException subclasses; only count real errors
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.registry.inc("fitbod_errors_total", metric=self.name)
+
+
+class Metrics:
+    """Process-wide instrumentation (FITBOD_METRICS=1, or the Config page's ?debug=1 panel)."""
+
+    _current = None  # per-rerun handle, saves the cache_resource lookup on hot paths
+
+    @staticmethod
+    def registry():
+        if Metrics._current is None:
+            Metrics._current = Metrics._shared()
+        return Metrics._current
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def _shared():
+        return MetricsRegistry(enabled=AppConfig.METRICS)
+
+    @staticmethod
+    def timed(name, **labels):
+        """Decorator recording each call's latency in histogram `name`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                registry = Metrics.registry()
+                if not registry.enabled:
+                    return fn(*args, **kwargs)
+                with MetricsTimer(registry, name, labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+class CatalogIndex:
+    """Precomputed tag/category lookups over an exercise catalog.
+
+    Built once per catalog: tag -> exercise bitsets for the safety exclusions
+    and a NumPy tag-incidence matrix for relevance scoring, so a plan request
+    is a handful of vectorized ops instead of a Python loop over every entry.
+    """
+
+    def __init__(self, exercises):
+        import numpy as np
+        self.exercises = exercises
+        self.size = len(exercises)
+        self.tag_ids = {}
+        self.cat_names = []
+        cat_ids = {}
+        rows, cols = [], []
+        cat_codes = np.empty(self.size, dtype=np.int32)
+        mins = np.empty(self.size, dtype=np.int32)
+        cal = np.empty(self.size, dtype=np.float64)
+
+        for i, ex in enumerate(exercises):
+            for tag in ex['tags']:
+                j = self.tag_ids.setdefault(tag, len(self.tag_ids))
+                rows.append(i)
+                cols.append(j)
+            cat = ex['cat']
+            if cat not in cat_ids:
+                cat_ids[cat] = len(self.cat_names)
+                self.cat_names.append(cat)
+            cat_codes[i] = cat_ids[cat]
+            mins[i] = ex['mins']
+            cal[i] = ex['cal']
+
+        self.cat_codes = cat_codes
+        self.mins = mins
+        self.cal = cal
+        # Rank in calories-descending order (ties by position): CandidatePool's last sort key as one integer
+        self.cal_rank = np.empty(self.size, dtype=np.int64)
+        self.cal_rank[np.argsort(-cal, kind='stable')] = np.arange(self.size)
+        # Column-major so selecting a few tag columns reads contiguous memory.
+        self.incidence = np.zeros((self.size, len(self.tag_ids)), dtype=bool, order='F')
+        self.incidence[rows, cols] = True
+        self.all_bits = (1 << self.size) - 1
+        self.tag_bits = {
+            tag: int.from_bytes(np.packbits(self.incidence[:, j], bitorder='little').tobytes(), 'little')
+            for tag, j in self.tag_ids.items()
+        }
+        # Lives and dies with this index, so a catalog change starts from an empty cache
+        self.pools = CandidateCache()
+
+    def bits_any(self, tags):
+        """Bitset of exercises carrying at least one of `tags`."""
+        bits = 0
+        for tag in tags:
+            bits |= self.tag_bits.get(tag, 0)
+        return bits
+
+    def mask(self, bits):
+        """Expands an exercise bitset into a boolean NumPy mask."""
+        import numpy as np
+        raw = np.frombuffer(bits.to_bytes((self.size + 7) // 8, 'little'), dtype=np.uint8)
+        return np.unpackbits(raw, count=self.size, bitorder='little').astype(bool)
+
+    def tag_columns(self, tags):
+        """Incidence-matrix columns for the known `tags`."""
+        return [self.tag_ids[t] for t in dict.fromkeys(tags) if t in self.tag_ids]
+
+    def candidate_indices(self, disability, goal):
+        """Catalog positions passing the safety filter with a positive relevance score."""
+        return self.candidate_scores(disability, goal)[0]
+
+    def candidate_scores(self, disability, goal):
+        """`candidate_indices` plus each candidate's relevance score."""
+        import numpy as np
+        # 1. Safety Filter (Exclusion)
+        allowed = self.all_bits
+        for need, accepted in ExerciseEngine.SAFETY_RULES.items():
+            if need in disability:
+                allowed &= self.bits_any(accepted)
+        if not allowed:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)
+
+        # 2. Relevance Scoring
+        score = self.incidence[:, self.tag_columns(disability)].any(axis=1) * 10
+        goal_cats = np.array([goal in c for c in self.cat_names], dtype=bool)
+        score += (self.mask(self.tag_bits.get(goal, 0)) | goal_cats[self.cat_codes]) * 5
+
+        positions = np.flatnonzero(self.mask(allowed) & (score > 0))
+        return positions, score[positions]
+
+    def candidates(self, disability, goal):
+        """Exercises passing the filter, in catalog order."""
+        return [self.exercises[i] for i in self.candidate_indices(disability, goal)]
+
+    def profile_key(self, disability, goal):
+        """Canonical cache key: the needs that can change the pool (as a frozenset) plus the goal."""
+        needs = frozenset(d for d in disability if d in self.tag_ids or d in ExerciseEngine.SAFETY_RULES)
+        return needs, goal
+
+    def candidate_pool(self, disability, goal):
+        """`CandidatePool` for the profile, memoized per normalized profile."""
+        return self.pools.get(self.profile_key(disability, goal),
+                              lambda: CandidatePool(self, *self.candidate_scores(disability, goal)))
+
+
+class CandidatePool:
+    """One profile's candidates, grouped for the plan optimizer.
+
+    Members are sorted by (category, minutes, score desc, calories desc), so
+    each (category, minutes) group is a contiguous slice made of equal-score
+    tiers. The arrays are read-only: a pool is shared by every session with
+    the same profile.
+    """
+
+    def __init__(self, index, positions, scores):
+        import numpy as np
+        self.positions, self.scores = self._sorted(index, positions, scores)
+        self.mins = index.mins[self.positions]
+        self.cal = index.cal[self.positions]
+        cats = index.cat_codes[self.positions]
+        size = len(self.positions)
+        for array in (self.positions, self.scores, self.mins, self.cal):
+            array.flags.writeable = False
+
+        new_group = (np.diff(cats) != 0) | (np.diff(self.mins) != 0)
+        group_starts = [0, *(np.flatnonzero(new_group) + 1).tolist(), size]
+        tier_starts = [0, *(np.flatnonzero(new_group | (np.diff(self.scores) != 0)) + 1).tolist(), size]
+        # (category code, minutes, [(start, end, score) per tier, best first]) per group
+        self.groups = []
+        tiers = iter(zip(tier_starts, tier_starts[1:]))
+        for a, b in zip(group_starts, group_starts[1:]) if size else ():
+            group = []
+            for start, end in tiers:
+                group.append((start, end, int(self.scores[start])))
+                if end == b:
+                    break
+            self.groups.append((int(cats[a]), int(self.mins[a]), group))
+        self.top_score = int(self.scores.max()) if size else 0
+        self.kcal_per_min = float(np.median(self.cal / np.maximum(self.mins, 1))) if size else 0.0
+
+    def __len__(self):
+        return len(self.positions)
+
+    @staticmethod
+    def _sorted(index, positions, scores):
+        """(positions, scores) in pool order, by one argsort over a packed integer key.
+
+        The key is (category, minutes, -score, calorie rank) in mixed radix,
+        several times faster than a four-key lexsort; the calorie rank makes
+        every key unique, so the order is the same either way.
+        """
+        import numpy as np
+        if not len(positions):
+            return positions, scores
+        cats, mins = index.cat_codes[positions].astype(np.int64), index.mins[positions].astype(np.int64)
+        low, high = int(scores.min()), int(scores.max())
+        score_span, mins_span = high - low + 1, int(mins.max()) + 1
+        if (int(cats.max()) + 1) * mins_span * score_span * index.size >= 2 ** 63:
+            cal = index.cal[positions]
+            order = np.lexsort((-cal, -scores, mins, cats))
+        else:
+            key = ((cats * mins_span + mins) * score_span + (high - scores)) * index.size + index.cal_rank[positions]
+            order = key.argsort()
+        return positions[order], scores[order]
+
+
+class CandidateCache:
+
+    """Bounded LRU of candidate pools keyed by normalized profile.
+
+    Many users share a (disability set, goal) combination, so plan requests
+    after the first only pay for the plan optimizer. Bounded by entry count
+    and by the total positions held, whichever is hit first.
+    """
+
+    def __init__(self, max_entries=256, max_items=2_000_000):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self.items = self.hits = self.misses = self.evictions = 0
+        self._pools = OrderedDict()  # key -> CandidatePool, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self.hits += 1
+                self._pools.move_to_end(key)
+                return pool
+            self.misses += 1
+
+        pool = compute()
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = pool
+                self.items += len(pool)
+                while len(self._pools) > 1 and (len(self._pools) > self.max_entries or self.items > self.max_items):
+                    _, old = self._pools.popitem(last=False)
+                    self.items -= len(old)
+                    self.evictions += 1
+        return pool
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._pools),
+            "items": self.items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class PlanOptimizer:
+    """Picks the exercises that best fill a session's time budget.
+
+    A group knapsack over minutes: per category, a 0/1 knapsack over its
+    shortlist gives the best value for every (items, minutes) pair; the
+    categories are then combined by a max-plus convolution and the best
+    total within the budget is traced back. An exercise is worth its share of
+    the session times its relevance (plus its share of the calorie goal, when
+    there is one), so plans fill the time with the most relevant minutes.
+    Each category used earns `diversity` and each repeat inside a category
+    costs `repeat_penalty`. Ties are broken from the seeded `rng` (and
+    `jitter` adds a little seeded noise), so Shuffle varies the plan and a
+    fixed seed reproduces it.
+
+    Only a few members of each (category, minutes) group can make the plan,
+    so the DP runs over a few dozen items whatever the catalog size.
+    """
+
+    def __init__(self, relevance=1.0, calories=1.0, diversity=0.05, repeat_penalty=0.05,
+                 jitter=0.25, per_category=2, max_minutes=120):
+        self.relevance = relevance
+        self.calories = calories
+        self.diversity = diversity
+        self.repeat_penalty = repeat_penalty
+        self.jitter = jitter
+        self.per_category = per_category
+        self.max_minutes = max_minutes
+
+    def select(self, pool, minutes=None, calories=None, rng=random):
+        """Pool members (catalog positions) for the plan; the duration is a hard limit, calories a weight."""
+        import numpy as np
+        if not len(pool):
+            return []
+        if minutes is None:
+            # Calorie goal only: size the session from the pool's typical burn rate
+            minutes = calories / pool.kcal_per_min if calories and pool.kcal_per_min > 0 else AppConfig.SESSION_MINUTES
+        budget = int(min(max(minutes, 1), self.max_minutes))
+        limit = self._limit(pool, budget)
+
+        # Shortlist: the best `limit` of every (category, minutes) group that fits
+        slots, ranks, cells = {}, [], []  # category -> column; items per column; (rank, column, member, value)
+        for cat, m, tiers in pool.groups:
+            if m < 1 or m > budget:
+                continue
+            k = min(limit, budget // m)
+            members = self._members(pool, tiers, k, calories, rng)
+            share = m / budget
+            scored = sorted(((share * (self.relevance * score / pool.top_score + self.jitter * rng.random())
+                              + (self.calories * float(pool.cal[i]) / calories if calories else 0.0), i)
+                             for i, score in members), reverse=True)[:k]
+            c = slots.setdefault(cat, len(slots))
+            if c == len(ranks):
+                ranks.append(0)
+            for value, i in scored:
+                cells.append((ranks[c], c, i, value))
+                ranks[c] += 1
+        if not cells:
+            # Nothing fits: the most relevant of the shortest exercises
+            shortest = np.flatnonzero(pool.mins == pool.mins.min())
+            return [int(pool.positions[shortest[pool.scores[shortest].argmax()]])]
+
+        # [n, c] = n-th shortlisted item of category column c; padding has 0 min and no value
+        rank, column, members, values = (np.array(a) for a in zip(*cells))
+        shape = (max(ranks), len(ranks))
+        item = np.zeros(shape, dtype=np.intp)
+        mins = np.zeros(shape, dtype=np.intp)
+        vals = np.full(shape, -np.inf)
+        item[rank, column] = members
+        mins[rank, column] = pool.mins[members]
+        vals[rank, column] = values
+        best, counts, keep = self._categories(mins, vals, budget, limit)
+
+        span = np.arange(budget + 1)
+        total = np.full(budget + 1, -np.inf)
+        total[0] = 0.0
+        choices = []
+        for c in range(shape[1]):
+            used = np.flatnonzero(best[c] > -np.inf)  # reachable minute totals (always includes 0)
+            rest = span[:, None] - used[None, :]
+            fits = rest >= 0
+            rest[~fits] = 0
+            joint = np.where(fits, total[rest] + best[c, used], -np.inf)
+            pick = joint.argmax(axis=1)
+            choices.append(used[pick])
+            total = joint[span, pick]
+
+        t, picks = int(total.argmax()), []
+        for c in reversed(range(shape[1])):
+            used = int(choices[c][t])
+            t -= used
+            j = int(counts[c, used])
+            for n in range(shape[0] - 1, -1, -1):
+                if j and keep[n, j, c, used]:
+                    picks.append(item[n, c])
+                    used -= int(mins[n, c])
+                    j -= 1
+        return [int(pool.positions[i]) for i in reversed(picks)]
+
+    @staticmethod
+    def _members(pool, tiers, k, calories, rng):
+        """(member, score) pairs that could be a group's best `k`."""
+        if calories:
+            # Tiers are sorted by calories, so each tier's first k are its best
+            return [(i, score) for start, end, score in tiers for i in range(start, min(end, start + k))]
+        # Without a calorie goal a tier's members are interchangeable: draw k at random
+        members = []
+        for start, end, score in tiers:
+            take = min(k - len(members), end - start)
+            # A tier taken whole needs no draw (the caller re-ranks with jitter anyway)
+            picks = range(start, end) if take == end - start else rng.sample(range(start, end), take)
+            members += [(i, score) for i in picks]
+            if len(members) == k:
+                break
+        return members
+
+    def _limit(self, pool, budget):
+        """Items allowed per category: `per_category`, raised only while that couldn't fill the budget."""
+        lengths = {}
+        for cat, m, tiers in pool.groups:
+            if 1 <= m <= budget:
+                lengths.setdefault(cat, []).extend([m] * min(tiers[-1][1] - tiers[0][0], budget // m))
+        longest = [sorted(v, reverse=True) for v in lengths.values()]
+        limit = self.per_category
+        while limit < max(map(len, longest), default=0) and sum(sum(v[:limit]) for v in longest) < budget:
+            limit += 1
+        return limit
+
+    def _categories(self, mins, vals, budget, limit):
+        """Per category column: best value for every exact minute total, the item count behind it, and the DP choices.
+
+        A 0/1 knapsack with an item-count dimension, run for all categories at
+        once: step n offers every category its n-th shortlisted item.
+        """
+        import numpy as np
+        items, columns = mins.shape
+        span = np.arange(budget + 1)
+        rows = np.arange(columns)[:, None]
+        f = np.full((columns, limit + 1, budget + 1), -np.inf)
+        f[:, 0, 0] = 0.0
+        keep = np.zeros((items, limit + 1, columns, budget + 1), dtype=bool)
+        for n in range(items):
+            source = span[None, :] - mins[n][:, None]
+            fits = source >= 0
+            source[~fits] = 0
+            for j in range(min(n + 1, limit), 0, -1):
+                taken = np.where(fits, f[rows, j - 1, source] + vals[n][:, None], -np.inf)
+                better = taken > f[:, j]
+                keep[n, j] = better
+                f[:, j] = np.where(better, taken, f[:, j])
+        bonus = [0.0] + [self.diversity - self.repeat_penalty * (j - 1) for j in range(1, limit + 1)]
+        f += np.array(bonus)[None, :, None]
+        counts = f.argmax(axis=1)
+        return np.take_along_axis(f, counts[:, None, :], axis=1)[:, 0], counts, keep
+
+
 class ExerciseEngine:
+    # A profile need -> tags an exercise must carry (any of) to stay eligible.
+    SAFETY_RULES = {
+        "Bed-Bound": ("Bed-Bound",),
+        "Wheelchair User": ("Wheelchair User", "Upper Body", "Cardio"),
+    }
+
+    OPTIMIZER = PlanOptimizer()
+
+    _current = None  # (catalog, index) for this rerun; skips re-fingerprinting the same catalog
+
+    @staticmethod
+    def index():
+        """Shared index over the bundled catalog, rebuilt only when it changes."""
+        catalog = DataRepository.exercises()
+        current = ExerciseEngine._current
+        if current is None or current[0] is not catalog:
+            current = ExerciseEngine._current = (catalog, ExerciseEngine._build_index(DataRepository.catalog_fingerprint()))
+        return current[1]
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False, max_entries=4)
+    def _build_index(fingerprint):
+        with Metrics.registry().timer("fitbod_index_build_seconds"):
+            return CatalogIndex(DataRepository.exercises())
+
+    _search_current = None  # (catalog, search index) for this rerun
+
+    @staticmethod
+    def search_index():
+        """Shared Library search index over the catalog, rebuilt only when it changes."""
+        catalog = DataRepository.exercises()
+        current = ExerciseEngine._search_current
+        if current is None or current[0] is not catalog:
+            current = ExerciseEngine._search_current = (catalog, ExerciseEngine._build_search(DataRepository.catalog_fingerprint()))
+        return current[1]
+
+    @staticmethod
+    @st.cache_resource(show_spinner="Indexing the library…", max_entries=4)
+    def _build_search(fingerprint):
+        with Metrics.registry().timer("fitbod_search_build_seconds"):
+            return SearchIndex(DataRepository.exercises())
+
     @staticmethod
-    def generate_plan(profile):
-        """Intelligent filtering based on disability and goals."""
+    @Metrics.timed("fitbod_plan_seconds")
+    def generate_plan(profile, index=None, rng=None, minutes=None, calories=None):
+        """Intelligent filtering based on disability and goals, fitted to a session length and/or calorie goal.
+
+        `minutes`/`calories` default to the profile's own keys, then to
+        AppConfig.SESSION_MINUTES.
+        """
+        if index is None:
+            index = ExerciseEngine.index()
+        return [index.exercises[i] for i in ExerciseEngine._select(profile, index, rng or random, minutes, calories)]
+
+    @staticmethod
+    def _select(profile, index, rng, minutes=None, calories=None):
         disability = profile.get('disability', [])
         # equipment = profile.get('equipment', []) # Future implementation
         goal = profile.get('goal', 'General')
-        
-        candidates = []
-        
-        for ex in DataRepository.EXERCISES:
-            score = 0
-            
-            # 1. Safety Filter (Exclusion)
-            if "Bed-Bound" in disability and "Bed-Bound" not in ex['tags']: continue
-            if "Wheelchair User" in disability and "Wheelchair User" not in ex['tags'] and "Upper Body" not in ex['tags'] and "Cardio" not in ex['tags']: continue
-            
-            # 2. Relevance Scoring
-            if any(t in ex['tags'] for t in disability): score += 10
-            if goal in ex['tags'] or goal in ex['cat']: score += 5
-            
-            if score > 0:
-                candidates.append(ex)
-        
-        # 3. Selection
-        random.shuffle(candidates)
-        return candidates[:3] if len(candidates) >= 3 else candidates
+        pool = index.candidate_pool(disability, goal)
+
+        # 3. Selection (catalog positions; callers materialize only the picks)
+        minutes = minutes or profile.get('minutes')
+        calories = calories or profile.get('calories')
+        if not minutes and not calories:
+            minutes = AppConfig.SESSION_MINUTES
+        return ExerciseEngine.OPTIMIZER.select(pool, minutes, calories, rng)
+
+    @staticmethod
+    @Metrics.timed("fitbod_plan_batch_seconds")
+    def generate_plans(profiles, seed=0, index=None, workers=1, chunk_size=500):
+        """Batch plan generation (e.g. nightly "Today's Focus" precompute).
+
+        Every profile gets its own RNG seeded from (`seed`, position), so the
+        result is reproducible and independent of chunking or worker count.
+        With `workers` > 1 the batch is split into chunks and spread over a
+        process pool; each worker builds the catalog index once.
+        """
+        profiles = list(profiles)
+        if index is None:
+            index = ExerciseEngine.index()
+        jobs = [(seed, start, profiles[start:start + chunk_size]) for start in range(0, len(profiles), chunk_size)]
+
+        if workers <= 1 or len(jobs) < 2:
+            chunks = [ExerciseEngine._plan_chunk(job, index) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=ExerciseEngine._init_worker, initargs=(index.exercises,))
+            with pool:
+                chunks = list(pool.map(ExerciseEngine._plan_chunk, jobs))
+
+        # Chunks hold catalog positions; resolve them against the local index.
+        return [[index.exercises[i] for i in picks] for chunk in chunks for picks in chunk]
+
+    _worker_index = None
+
+    @staticmethod
+    def _init_worker(exercises):
+        ExerciseEngine._worker_index = CatalogIndex(exercises)
+
+    @staticmethod
+    def _plan_chunk(job, index=None):
+        seed, start, profiles = job
+        if index is None:
+            index = ExerciseEngine._worker_index
+        return [
+            ExerciseEngine._select(profile, index, random.Random(f"{seed}:{start + offset}"))
+            for offset, profile in enumerate(profiles)
+        ]
+
+class SearchIndex:
+    """Inverted index over the exercise catalog for the Library page.
+
+    Every word of title, category, tags and instructions is a term with a
+    postings list of (exercise, field weight). Terms are stored sorted in
+    one CSR array, so a prefix ("sea" -> seated, seat...) is a contiguous
+    slice found by bisection and scored with a single bincount. A word that
+    starts no term falls back to substring matches through a trigram index
+    over the vocabulary. Facet counts (category, tag) come from bincounts
+    over the matching exercises.
+    """
+
+    FIELD_WEIGHTS = {"title": 3, "cat": 2, "tags": 2, "ins": 1}
+    TOKEN = re.compile(r"\w+")
+
+    def __init__(self, exercises):
+        import numpy as np
+        self.exercises = exercises
+        self.size = len(exercises)
+        term_ids, tag_ids, cat_ids = {}, {}, {}
+        post_terms, post_docs, post_weights = array("i"), array("i"), array("b")
+        pair_tags, pair_docs = array("i"), array("i")
+        cat_codes = array("i")
+        title_w, label_w, ins_w = (self.FIELD_WEIGHTS[f] for f in ("title", "tags", "ins"))
+
+        for i, ex in enumerate(exercises):
+            # Lowest weight first, so a word keeps its best field's weight
+            weights = dict.fromkeys(self.tokenize(" ".join(ex['ins'])), ins_w)
+            weights.update(dict.fromkeys(self.tokenize(" ".join([ex['cat'], *ex['tags']])), label_w))
+            weights.update(dict.fromkeys(self.tokenize(ex['title']), title_w))
+            for term, weight in weights.items():
+                post_terms.append(term_ids.setdefault(term, len(term_ids)))
+                post_docs.append(i)
+                post_weights.append(weight)
+            for tag in dict.fromkeys(ex['tags']):
+                pair_tags.append(tag_ids.setdefault(tag, len(tag_ids)))
+                pair_docs.append(i)
+            cat_codes.append(cat_ids.setdefault(ex['cat'], len(cat_ids)))
+
+        # Renumber terms alphabetically so every prefix is a contiguous id range
+        self.vocab = sorted(term_ids)
+        rank = np.empty(len(self.vocab), dtype=np.int32)
+        rank[[term_ids[t] for t in self.vocab]] = np.arange(len(self.vocab), dtype=np.int32)
+        terms = rank[np.frombuffer(post_terms, dtype=np.int32)]
+        order = np.argsort(terms, kind="stable")
+        self.docs = np.frombuffer(post_docs, dtype=np.int32)[order]
+        self.weights = np.frombuffer(post_weights, dtype=np.int8)[order].astype(np.float64)
+        self.indptr = np.searchsorted(terms[order], np.arange(len(self.vocab) + 1))
+
+        self.cat_names = list(cat_ids)
+        self.cat_codes = np.frombuffer(cat_codes, dtype=np.int32)
+        self.tag_names = list(tag_ids)
+        self.tag_lookup = tag_ids
+        # (exercise, tag) pairs, in exercise order and grouped by tag
+        self.pair_tags = np.frombuffer(pair_tags, dtype=np.int32)
+        pair_docs = np.frombuffer(pair_docs, dtype=np.int32)
+        self.doc_indptr = np.searchsorted(pair_docs, np.arange(self.size + 1))
+        by_tag = np.argsort(self.pair_tags, kind="stable")
+        self.tag_docs = pair_docs[by_tag]
+        self.tag_indptr = np.searchsorted(self.pair_tags[by_tag], np.arange(len(self.tag_names) + 1))
+        self.all_tag_counts = np.bincount(self.pair_tags, minlength=len(self.tag_names))
+        self._grams = None  # trigram -> term ids, built on the first substring lookup
+
+    @staticmethod
+    def tokenize(text):
+        return SearchIndex.TOKEN.findall(text.casefold())
+
+    def terms(self, word):
+        """Term ids matching `word`: a (start, end) id range by prefix, else substring matches."""
+        start = bisect.bisect_left(self.vocab, word)
+        end = bisect.bisect_left(self.vocab, word + "\U0010ffff", start)
+        if end > start or len(word) < 3:
+            return range(start, end)
+        grams = self._trigrams()
+        found = None
+        for k in range(len(word) - 2):
+            ids = grams.get(word[k:k + 3], set())
+            found = ids if found is None else found & ids
+            if not found:
+                return []
+        return sorted(t for t in found if word in self.vocab[t])
+
+    def _trigrams(self):
+        if self._grams is None:
+            grams = {}
+            for t, term in enumerate(self.vocab):
+                for k in range(len(term) - 2):
+                    grams.setdefault(term[k:k + 3], set()).add(t)
+            self._grams = grams  # concurrent first lookups just build it twice
+        return self._grams
+
+    def _score(self, word):
+        """Per-exercise score for one query word (0 = no match)."""
+        import numpy as np
+        ids = self.terms(word)
+        if isinstance(ids, range):
+            span = slice(self.indptr[ids.start], self.indptr[ids.stop])
+            docs, weights = self.docs[span], self.weights[span]
+        elif ids:
+            spans = [slice(self.indptr[t], self.indptr[t + 1]) for t in ids]
+            docs = np.concatenate([self.docs[s] for s in spans])
+            weights = np.concatenate([self.weights[s] for s in spans])
+        else:
+            return np.zeros(self.size)
+        return np.bincount(docs, weights, minlength=self.size)
+
+    def _tag_counts(self, docs):
+        """Tag occurrences over the exercises `docs`."""
+        import numpy as np
+        starts = self.doc_indptr[docs]
+        lengths = self.doc_indptr[docs + 1] - starts
+        # Positions of every pair of every doc, without a Python loop
+        pairs = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.pair_tags[pairs], minlength=len(self.tag_names))
+
+    @Metrics.timed("fitbod_search_seconds")
+    def search(self, query, categories=(), tags=(), within=None, limit=20):
+        """Best `limit` matches for `query` plus facet counts.
+
+        Every word of the query must match (by prefix, else by substring).
+        `within` restricts the search to those catalog positions. Facet
+        counts cover the query matches before the `categories`/`tags`
+        filters, so they show what each filter would leave. Returns
+        {"total", "positions", "categories": {name: n}, "tags": {name: n}}.
+        """
+        import numpy as np
+        score = None
+        for word in dict.fromkeys(self.tokenize(query)):
+            s = self._score(word)
+            score = s if score is None else np.where((score > 0) & (s > 0), score + s, 0.0)
+        matched = score > 0 if score is not None else np.ones(self.size, dtype=bool)
+        if within is not None:
+            allowed = np.zeros(self.size, dtype=bool)
+            allowed[np.asarray(within, dtype=np.intp)] = True
+            matched &= allowed
+
+        cat_counts = np.bincount(self.cat_codes[matched], minlength=len(self.cat_names))
+        if matched.sum() * 2 <= self.size:
+            tag_counts = self._tag_counts(np.flatnonzero(matched))
+        else:
+            tag_counts = self.all_tag_counts - self._tag_counts(np.flatnonzero(~matched))
+        if categories:
+            codes = [self.cat_names.index(c) for c in categories if c in self.cat_names]
+            matched &= np.isin(self.cat_codes, codes)
+        for tag in tags:
+            t = self.tag_lookup.get(tag)
+            carries = np.zeros(self.size, dtype=bool)
+            if t is not None:
+                carries[self.tag_docs[self.tag_indptr[t]:self.tag_indptr[t + 1]]] = True
+            matched &= carries
+
+        hits = np.flatnonzero(matched)
+        if score is not None and len(hits):
+            # Best score first, then catalog order; the key is unique so the cut is deterministic
+            key = score[hits].astype(np.int64) * (self.size + 1) + (self.size - hits)
+            if len(hits) > limit:
+                hits = hits[np.argpartition(-key, limit)[:limit]]
+                key = score[hits].astype(np.int64) * (self.size + 1) + (self.size - hits)
+            hits = hits[np.argsort(-key)]
+        return {
+            "total": int(matched.sum()),
+            "positions": hits[:limit].tolist(),
+            "categories": {self.cat_names[c]: int(cat_counts[c]) for c in np.flatnonzero(cat_counts)},
+            "tags": {self.tag_names[t]: int(tag_counts[t]) for t in np.argsort(-tag_counts, kind="stable") if tag_counts[t]},
+        }
+
+
+class GTTSSynthesizer:
+    """Google Translate TTS (needs network)."""
+    name = "gtts"
+    mime = "audio/mp3"
+    suffix = ".mp3"
+
+    @property
+    def version(self):
+        import gtts
+        return gtts.__version__
+
+    def __call__(self, text, lang):
+        import gtts
+        mp3_fp = io.BytesIO()
+        gtts.gTTS(text=text, lang=lang).write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+
+class StubSynthesizer:
+    """Offline stand-in: a short silent WAV sized to the text, for tests and benchmarks."""
+    name = "stub"
+    version = "1"
+    mime = "audio/wav"
+    suffix = ".wav"
+
+    def __call__(self, text, lang):
+        out = io.BytesIO()
+        with wave.open(out, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(8000)
+            # ~60ms per character, close to a real speaking rate (and MP3 size)
+            w.writeframes(b"\x80" * (480 * min(len(text), 400)))
+        return out.getvalue()
+
+
+class TTSCache:
+    """Content-addressed on-disk cache of synthesized speech.
+
+    Entries are keyed by sha256(engine, engine version, lang, text), so a new
+    engine release never serves stale audio. The directory is bounded to
+    `max_bytes`; least recently used files (by mtime, refreshed on every hit)
+    are evicted first, which keeps the order across restarts.
+    """
+
+    def __init__(self, directory, synthesizer, max_bytes=AppConfig.TTS_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.synthesizer = synthesizer
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted((f for f in self.directory.glob("*/*") if f.suffix != ".tmp"), key=lambda f: f.stat().st_mtime)
+        for f in files:
+            self._entries[f] = f.stat().st_size
+        self.total_bytes = sum(self._entries.values())
+
+    def path_for(self, text, lang='en'):
+        synth = self.synthesizer
+        key = hashlib.sha256(f"{synth.name}\0{synth.version}\0{lang}\0{text}".encode()).hexdigest()
+        return self.directory / key[:2] / f"{key}{synth.suffix}"
+
+    def get(self, text, lang='en'):
+        """Returns audio bytes for `text`, synthesizing and storing them on a miss."""
+        path = self.path_for(text, lang)
+        with self._lock:
+            if path in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(path)
+                os.utime(path)
+                return path.read_bytes()
+            self.misses += 1
+
+        data = self.synthesizer(text, lang)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.total_bytes += len(data) - self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            self._evict()
+        return data
+
+    def contains(self, text, lang='en'):
+        """True when `get` would be served from disk."""
+        path = self.path_for(text, lang)
+        with self._lock:
+            return path in self._entries
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "engine": f"{self.synthesizer.name}/{self.synthesizer.version}",
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+class AudioPrefetcher:
+    """Synthesizes clips into a TTSCache on a bounded thread pool.
+
+    Requests for text that is already in flight share one future, and a
+    failed synthesis is not retried for `retry_after` seconds, so pages that
+    poll `status` neither duplicate work nor hammer an unreachable engine.
+    """
+
+    def __init__(self, cache, workers=AppConfig.TTS_PREFETCH_WORKERS, metrics=None, retry_after=60.0):
+        from concurrent.futures import ThreadPoolExecutor
+        self.cache = cache
+        self.metrics = metrics
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-prefetch")
+        self._lock = threading.Lock()
+        self._inflight = {}  # (text, lang) -> Future
+        self._failed = {}    # (text, lang) -> monotonic time of the failure
+
+    def submit(self, text, lang='en'):
+        """Future for `text`'s audio, reusing the in-flight one for identical text."""
+        key = (text, lang)
+        with self._lock:
+            future = self._inflight.get(key)
+            created = future is None
+            if created:
+                self._failed.pop(key, None)
+                future = self._inflight[key] = self._pool.submit(self._synthesize, text, lang)
+        if created:
+            # Outside the lock: a future that is already done runs the callback right here
+            future.add_done_callback(functools.partial(self._settle, key))
+        return future
+
+    def prefetch(self, texts, lang='en'):
+        """Queues every text not cached yet; returns how many were queued."""
+        missing = [t for t in dict.fromkeys(texts) if not self.cache.contains(t, lang)]
+        for text in missing:
+            self.submit(text, lang)
+        return len(missing)
+
+    def status(self, text, lang='en'):
+        """"ready", "pending" or "failed"; unknown text is queued and reported pending."""
+        key = (text, lang)
+        with self._lock:
+            if key in self._inflight:
+                return "pending"
+            failed_at = self._failed.get(key)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+                return "failed"
+        if self.cache.contains(text, lang):
+            return "ready"
+        self.submit(text, lang)
+        return "pending"
+
+    def _synthesize(self, text, lang):
+        if self.metrics is None:
+            return self.cache.get(text, lang)
+        with self.metrics.timer("fitbod_tts_prefetch_seconds"):
+            return self.cache.get(text, lang)
+
+    def _settle(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if future.exception() is not None:
+                self._failed[key] = time.monotonic()
+
 
 class AccessibilityManager:
+    SYNTHESIZERS = {"gtts": GTTSSynthesizer, "stub": StubSynthesizer}
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def tts_cache(engine=None):
+        """Process-wide TTS cache for `engine` (defaults to AppConfig.TTS_ENGINE)."""
+        engine = engine or AppConfig.TTS_ENGINE
+        synthesizer = AccessibilityManager.SYNTHESIZERS[engine]()
+        return TTSCache(AppConfig.CACHE_DIR / "tts", synthesizer)
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def prefetcher(engine=None):
+        """Process-wide background synthesizer feeding `tts_cache(engine)`."""
+        return AudioPrefetcher(AccessibilityManager.tts_cache(engine), metrics=Metrics.registry())
+
+    @staticmethod
+    def spoken_texts(ex):
+        """The clips for an exercise card: its title, then one per instruction step."""
+        return [ex['title'], *(f"Step {i + 1}. {step}" for i, step in enumerate(ex['ins']))]
+
+    @staticmethod
+    def plan_texts(plan):
+        return [text for ex in plan for text in AccessibilityManager.spoken_texts(ex)]
+
+    @staticmethod
+    def prefetch_plan(plan):
+        """Starts synthesizing every clip of `plan` in the background."""
+        return AccessibilityManager.prefetcher().prefetch(AccessibilityManager.plan_texts(plan))
+
+    @staticmethod
+    def speech(text, lang='en'):
+        """(cache, audio bytes) for `text`, recording lookup latency by hit/miss."""
+        cache = AccessibilityManager.tts_cache()
+        metrics = Metrics.registry()
+        if not metrics.enabled:
+            return cache, cache.get(text, lang=lang)
+        misses, start = cache.misses, time.perf_counter()
+        try:
+            data = cache.get(text, lang=lang)
+        except Exception:
+            metrics.inc("fitbod_tts_requests_total", result="error")
+            raise
+        result = "miss" if cache.misses != misses else "hit"
+        metrics.observe("fitbod_tts_seconds", time.perf_counter() - start, result=result)
+        metrics.inc("fitbod_tts_requests_total", result=result)
+        return cache, data
+
+    OFFLINE_HTML = '<div style="font-size:0.8rem; color:#888;">Audio unavailable offline.</div>'
+
+    PENDING_HTML = '<div style="font-size:0.8rem; color:#888;">🔊 Preparing audio…</div>'
+
+    @staticmethod
+    def render_audio(text):
+        """Renders a TTS player for `text` using AppConfig.AUDIO_DELIVERY.
+
+        Never synthesizes on the render path: until the prefetcher has the
+        clip on disk a placeholder is shown instead (see Views._audio_progress).
+        """
+        status = AccessibilityManager.prefetcher().status(text)
+        if status != "ready":
+            html = AccessibilityManager.PENDING_HTML if status == "pending" else AccessibilityManager.OFFLINE_HTML
+            st.markdown(html, unsafe_allow_html=True)
+            return
+        if AppConfig.AUDIO_DELIVERY == "inline":
+            st.markdown(AccessibilityManager.get_audio_player(text), unsafe_allow_html=True)
+            return
+        try:
+            cache, data = AccessibilityManager.speech(text)
+        except Exception:
+            st.markdown(AccessibilityManager.OFFLINE_HTML, unsafe_allow_html=True)
+            return
+        # The media file manager stores the bytes once (keyed by content hash)
+        # and the element only carries its URL, so reruns stay small.
+        st.audio(data, format=cache.synthesizer.mime)
+
     @staticmethod
     def get_audio_player(text):
-        """Generates an HTML5 audio player for TTS."""
+        """Generates an HTML5 audio player for TTS with the audio inlined as base64."""
         try:
-            tts = gTTS(text=text, lang='en')
-            mp3_fp = io.BytesIO()
-            tts.write_to_fp(mp3_fp)
-            mp3_fp.seek(0)
-            b64 = base64.b64encode(mp3_fp.read()).decode()
+            cache, data = AccessibilityManager.speech(text)
+            b64 = base64.b64encode(data).decode()
+            mime = cache.synthesizer.mime
             return f'''
                 <audio controls style="width: 100%; margin-top: 10px; border-radius: 20px;">
-                    <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
+                    <source src="data:{mime};base64,{b64}" type="{mime}">
                 </audio>
             '''
-        except:
-            return '<div style="font-size:0.8rem; color:#888;">Audio unavailable offline.</div>'
+        except Exception:
+            return AccessibilityManager.OFFLINE_HTML
 
 # ==========================================
 # 4. UI / UX LAYER (DESIGN SYSTEM)
 # ==========================================
 
 class DesignSystem:
+    """Theme registry plus the shared stylesheet template.
+
+    Each theme's stylesheet is built and minified once per process (see
+    `stylesheet`), so a rerun only pays for a dictionary lookup.
+    """
+
+    FONT_STACK = "-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif"
+
+    THEMES = {
+        # --- APPLE CUPERTINO STANDARD (MODERN) ---
+        "modern": {
+            "variables": {
+                "--bg-color": "#F5F5F7",
+                "--card-bg": "#FFFFFF",
+                "--text-color": "#1D1D1F",
+                "--subtext-color": "#86868B",
+                "--border-color": "rgba(0,0,0,0.05)",
+                "--accent-color": "#007AFF",
+                "--shadow": "0 4px 24px rgba(0,0,0,0.04)",
+                "--glass": "blur(20px) saturate(180%)",
+                "--radius": "20px",
+            },
+            "button_border": "none",
+        },
+        # --- MICROSOFT ACCESSIBILITY STANDARD (HC) ---
+        "high_contrast": {
+            "variables": {
+                "--bg-color": "#000000",
+                "--card-bg": "#000000",
+                "--text-color": "#FFFF00",
+                "--border-color": "#FFFF00",
+                "--accent-color": "#FFFF00",
+                "--shadow": "none",
+                "--glass": "none",
+                "--radius": "0px",
+            },
+            "button_border": "2px solid #FFFF00",
+        },
+    }
+
     @staticmethod
-    def inject_css(high_contrast=False):
+    def register_theme(name, variables, button_border="none"):
+        """Adds (or replaces) a theme; `variables` maps CSS custom properties to values."""
+        DesignSystem.THEMES[name] = {"variables": dict(variables), "button_border": button_border}
+
+    @staticmethod
+    def inject_css(high_contrast=False, theme=None):
         """Injects the CSS framework based on mode."""
-        
-        # SHARED VARIABLES
-        font_stack = "-apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif"
-        
-        if high_contrast:
-            # --- MICROSOFT ACCESSIBILITY STANDARD (HC) ---
-            theme = """
-                --bg-color: #000000;
-                --card-bg: #000000;
-                --text-color: #FFFF00;
-                --border-color: #FFFF00;
-                --accent-color: #FFFF00;
-                --shadow: none;
-                --glass: none;
-                --radius: 0px;
-            """
-        else:
-            # --- APPLE CUPERTINO STANDARD (MODERN) ---
-            theme = """
-                --bg-color: #F5F5F7;
-                --card-bg: #FFFFFF;
-                --text-color: #1D1D1F;
-                --subtext-color: #86868B;
-                --border-color: rgba(0,0,0,0.05);
-                --accent-color: #007AFF;
-                --shadow: 0 4px 24px rgba(0,0,0,0.04);
-                --glass: blur(20px) saturate(180%);
-                --radius: 20px;
-            """
+        name = theme or ("high_contrast" if high_contrast else "modern")
+        with Metrics.registry().timer("fitbod_css_inject_seconds", theme=name):
+            st.markdown(DesignSystem.stylesheet(name), unsafe_allow_html=True)
+
+    @staticmethod
+    @st.cache_resource(show_spinner=False)
+    def _compiled():
+        # Process-wide: name -> (theme definition, minified stylesheet)
+        return {}
+
+    @staticmethod
+    def stylesheet(name):
+        """Minified stylesheet for a registered theme, compiled on first use."""
+        definition = DesignSystem.THEMES[name]
+        compiled = DesignSystem._compiled()
+        entry = compiled.get(name)
+        if entry is None or entry[0] != definition:
+            entry = compiled[name] = (definition, DesignSystem.minify(DesignSystem.build_css(definition)))
+        return entry[1]
+
+    @staticmethod
+    def minify(css):
+        """Drops comments and insignificant whitespace."""
+        css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+        css = re.sub(r"\s+", " ", css)
+        css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+        css = re.sub(r":\s+", ":", css)
+        return css.replace(";}", "}").strip()
+
+    @staticmethod
+    def build_css(theme):
+        """Renders the full stylesheet for a theme definition."""
+        font_stack = DesignSystem.FONT_STACK
+        variables = "\n".join(f"{k}: {v};" for k, v in theme['variables'].items())
 
         css = f"""
         <style>
             :root {{
-                {theme}
+                {variables}
             }}
             
             /* GLOBAL RESET */
@@ -247,7 +2364,7 @@ class DesignSystem:
                 background-color: var(--accent-color);
                 color: white;
                 border-radius: 999px;
-                border: {'2px solid #FFFF00' if high_contrast else 'none'};
+                border: {theme['button_border']};
                 padding: 12px 28px;
                 font-weight: 600;
                 font-size: 16px;
@@ -292,13 +2409,16 @@ class DesignSystem:
             .block-container {{ padding-top: 2rem; }}
         </style>
         """
-        st.markdown(css, unsafe_allow_html=True)
+        return css
 
 # ==========================================
 # 5. VIEW CONTROLLERS
 # ==========================================
 
 class Views:
+    NAV = [("🏠 Home", "home"), ("💪 Workout", "library"), ("📊 Stats", "stats"),
+           ("🥦 Food", "food"), ("🤝 Partners", "partners"), ("⚙️ Config", "settings")]
+
     @staticmethod
     def render_nav():
         """Renders the top sticky navigation."""
@@ -307,28 +2427,16 @@ class Views:
         
         with st.container():
             st.markdown('<div style="height: 10px;"></div>', unsafe_allow_html=True) # Spacer
-            c1, c2, c3, c4, c5, c6 = st.columns(6)
-            
-            def nav_btn(label, target):
-                if c1.button(label, key=f"nav_{target}", use_container_width=True):
-                    st.session_state.page = target
-                    st.rerun()
-
-            with c1: 
-                if st.button("🏠 Home", use_container_width=True): st.session_state.page = "home"; st.rerun()
-            with c2: 
-                if st.button("💪 Workout", use_container_width=True): st.session_state.page = "library"; st.rerun()
-            with c3: 
-                if st.button("📊 Stats", use_container_width=True): st.session_state.page = "stats"; st.rerun()
-            with c4: 
-                if st.button("🥦 Food", use_container_width=True): st.session_state.page = "food"; st.rerun()
-            with c5: 
-                if st.button("🤝 Partners", use_container_width=True): st.session_state.page = "partners"; st.rerun()
-            with c6: 
-                if st.button("⚙️ Config", use_container_width=True): st.session_state.page = "settings"; st.rerun()
+            # on_click callbacks switch the page before the rerun, so a click costs one run, not two
+            for col, (label, target) in zip(st.columns(len(Views.NAV)), Views.NAV):
+                col.button(label, use_container_width=True, on_click=Views._go, args=(target,))
                 
             st.markdown("---")
 
+    @staticmethod
+    def _go(page):
+        st.session_state.page = page
+
     @staticmethod
     def render_onboarding():
         st.markdown(
@@ -363,10 +2471,12 @@ class Views:
                     
                     if st.form_submit_button("Start My Journey"):
                         if name:
+                            # Stored data is keyed on an opaque id: display names aren't unique
                             st.session_state.user = {
-                                "name": name, "disability": disabilities, 
+                                "id": uuid.uuid4().hex, "name": name, "disability": disabilities,
                                 "goal": goal, "exp": exp
                             }
+                            DataRepository.user_store().save_profile(st.session_state.user['id'], st.session_state.user)
                             st.session_state.page = "home"
                             st.rerun()
                         else:
@@ -381,30 +2491,62 @@ class Views:
         quote = random.choice(DataRepository.QUOTES)
         st.info(f"✨ **Daily Insight:** {quote}")
         
-        # Metrics
-        m1, m2, m3 = st.columns(3)
-        m1.metric("Streak", f"{st.session_state.streak} Days", "Keeping it up!")
-        m2.metric("Workouts", len(st.session_state.history))
-        m3.metric("Hydration", f"{st.session_state.hydration} / 8", "Cups")
+        # Set by the Complete Workout callback; shown once on the following run
+        flash = st.session_state.pop('flash', None)
+        if flash:
+            st.balloons()
+            st.success(flash)
         
-        if st.button("💧 Log Water", use_container_width=True):
-            st.session_state.hydration += 1
-            st.toast("Hydration logged! Keep it up.")
-            time.sleep(0.5)
-            st.rerun()
+        Views._dashboard_metrics(user['id'])
             
         st.markdown("### Today's Focus")
+        Views._todays_focus(user)
+
+        st.markdown("---")
+        # Full-page run: the metrics and the plan both change
+        st.button("✅ Complete Workout", type="primary", on_click=Views._complete_workout, args=(user['id'],))
+
+    @staticmethod
+    @st.fragment
+    def _dashboard_metrics(uid):
+        """Metrics and water logging; a water click reruns only this fragment."""
+        store = DataRepository.user_store()
+        today = datetime.date.today()
+        # All three read pre-aggregated rows, never the raw activity log
+        streak, day, week = store.streaks(uid, today), store.day_totals(uid, today), store.week_totals(uid, today)
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Streak", f"{streak['current']} Days", "Keeping it up!" if streak['current'] else None)
+        m2.metric("This Week", f"{week['sessions']} Workouts", f"{week['minutes']} min")
+        m3.metric("Hydration", f"{day['cups']} / {AppConfig.WATER_GOAL_CUPS}", "Cups today")
         
+        st.button("💧 Log Water", use_container_width=True, on_click=Views._log_water, args=(uid,))
+        if st.session_state.pop('water_logged', False):
+            st.toast("Hydration logged! Keep it up.")
+
+    @staticmethod
+    @st.fragment
+    def _todays_focus(user):
+        """The plan cards; Shuffle reruns only this fragment."""
+        # Only show audio in high contrast/access mode or if requested
+        audio = st.session_state.high_contrast
+
+        st.select_slider("Session length", options=AppConfig.SESSION_LENGTHS, key="session_minutes",
+                         format_func=lambda m: f"{m} min", on_change=Views._shuffle)
+
         # Workout Logic
         if st.session_state.active_workout is None:
-            st.session_state.active_workout = ExerciseEngine.generate_plan(user)
+            st.session_state.active_workout = ExerciseEngine.generate_plan(user, minutes=st.session_state.session_minutes)
+            if audio:
+                AccessibilityManager.prefetch_plan(st.session_state.active_workout)
             
         plan = st.session_state.active_workout
         
         if not plan:
             st.warning("We couldn't match specific exercises to your exact criteria, but here are some general mobility movements.")
             # Fallback logic could go here
-        
+        else:
+            st.caption(f"{sum(e['mins'] for e in plan)} min • ~{sum(e['cal'] for e in plan)} kcal")
+
         for ex in plan:
             with st.container():
                 c_txt, c_meta = st.columns([3, 1])
@@ -415,43 +2557,132 @@ class Views:
                     st.markdown(f"**{ex['mins']}** min")
                 
                 with st.expander("Show Instructions"):
+                    clips = AccessibilityManager.spoken_texts(ex)
+                    if audio:
+                        AccessibilityManager.render_audio(clips[0])
                     for i, step in enumerate(ex['ins']):
                         st.write(f"{i+1}. {step}")
-                    
-                    if st.session_state.high_contrast:
-                        # Only show audio in high contrast/access mode or if requested
-                        st.markdown(AccessibilityManager.get_audio_player(f"{ex['title']}. {ex['ins'][0]}"), unsafe_allow_html=True)
+                        if audio:
+                            AccessibilityManager.render_audio(clips[i + 1])
 
-        st.markdown("---")
-        if st.button("✅ Complete Workout", type="primary"):
-            st.session_state.streak += 1
-            st.session_state.history.append({"date": datetime.date.today(), "minutes": sum(e['mins'] for e in plan)})
-            st.session_state.active_workout = None # Reset for next time
-            st.balloons()
-            st.success("Workout Complete! Streak updated.")
-            time.sleep(2)
-            st.rerun()
-            
-        if st.button("🔄 Shuffle Routine", type="secondary"):
-            st.session_state.active_workout = None
+        if audio:
+            texts = AccessibilityManager.plan_texts(plan)
+            prefetcher = AccessibilityManager.prefetcher()
+            if any(prefetcher.status(t) == "pending" for t in texts):
+                # Polls only while clips are pending; created per run so it stops once they land
+                st.fragment(Views._audio_progress, run_every=AppConfig.AUDIO_POLL_SECONDS)(texts)
+
+        st.button("🔄 Shuffle Routine", type="secondary", on_click=Views._shuffle)
+
+    @staticmethod
+    def _audio_progress(texts):
+        prefetcher = AccessibilityManager.prefetcher()
+        done = sum(prefetcher.status(t) != "pending" for t in texts)
+        if done == len(texts):
+            # A full run swaps the placeholders for players and drops this poller
             st.rerun()
+        st.caption(f"🔊 Preparing audio guide… {done}/{len(texts)} clips ready")
+
+    @staticmethod
+    def _log_water(uid):
+        DataRepository.user_store().log_water(uid, datetime.date.today())
+        st.session_state.water_logged = True
+
+    @staticmethod
+    def _shuffle():
+        st.session_state.active_workout = None
+
+    @staticmethod
+    def _complete_workout(uid):
+        plan = st.session_state.active_workout or []
+        store = DataRepository.user_store()
+        store.log_workout(uid, datetime.date.today(), sum(e['mins'] for e in plan))
+        st.session_state.active_workout = None # Reset for next time
+        st.session_state.flash = "Workout Complete! Streak updated."
+
+    @staticmethod
+    def render_library():
+        st.title("Workout Library 💪")
+        user = st.session_state.user
+        search = ExerciseEngine.search_index()
+
+        query = st.text_input("Search", key="library_query", placeholder="Try “seated”, “balance” or “press”",
+                              on_change=Views._reset_library_page)
+        within = None
+        if st.toggle("Only exercises for my profile", key="library_mine", on_change=Views._reset_library_page):
+            within = ExerciseEngine.index().candidate_pool(user.get('disability', []), user.get('goal', 'General')).positions
+
+        # Facet filters come from the previous run's widgets, so counts and results agree
+        shown = st.session_state.get('library_limit', AppConfig.LIBRARY_PAGE_SIZE)
+        picked_cats = st.session_state.get('library_cats', [])
+        picked_tags = st.session_state.get('library_tags', [])
+        result = search.search(query, categories=picked_cats, tags=picked_tags, within=within, limit=shown)
+
+        c_facets, c_results = st.columns([1, 3])
+        with c_facets:
+            cats, tags = result['categories'], result['tags']
+            st.multiselect("Category", list(dict.fromkeys([*cats, *picked_cats])), key="library_cats",
+                           format_func=lambda c: f"{c} ({cats.get(c, 0)})", on_change=Views._reset_library_page)
+            top_tags = list(tags)[:AppConfig.LIBRARY_TAG_FACETS]
+            st.multiselect("Tags", list(dict.fromkeys([*top_tags, *picked_tags])), key="library_tags",
+                           format_func=lambda t: f"{t} ({tags.get(t, 0)})", on_change=Views._reset_library_page)
+
+        with c_results:
+            total = result['total']
+            if not total:
+                st.info("No exercises match. Try a shorter word or clear a filter.")
+            else:
+                st.caption(f"{total} exercise{'s' if total != 1 else ''}")
+            for i in result['positions']:
+                ex = search.exercises[i]
+                with st.container():
+                    c_txt, c_meta = st.columns([3, 1])
+                    with c_txt:
+                        st.markdown(f"#### {ex['title']}")
+                        st.caption(f"{ex['cat']} • {', '.join(ex['tags'])}")
+                    with c_meta:
+                        st.markdown(f"**{ex['mins']}** min • {ex['cal']} kcal")
+                    with st.expander("Show Instructions"):
+                        for n, step in enumerate(ex['ins']):
+                            st.write(f"{n+1}. {step}")
+            if total > shown:
+                if st.button(f"Show more ({total - shown} remaining)"):
+                    st.session_state.library_limit = shown + AppConfig.LIBRARY_PAGE_SIZE
+                    st.rerun()
+
+    @staticmethod
+    def _reset_library_page():
+        st.session_state.pop('library_limit', None)
 
     @staticmethod
     def render_nutrition():
         st.title("Nutrition Market 🥦")
         st.write("Premium, adaptive recipes. Tap to purchase and auto-fill your shopping list.")
         
+        uid = st.session_state.user['id']
+        store = DataRepository.user_store()
+        inventory = store.inventory(uid)
+        recipes = DataRepository.recipes()
+        
+        unowned = [r for r in recipes if r['id'] not in inventory]
+        if len(unowned) > 1:
+            if st.button(f"Buy all {len(unowned)} recipes £{sum(r['price'] for r in unowned):.2f}"):
+                # Shared ingredients are merged into one line with a quantity
+                store.add_purchases(uid, unowned)
+                st.toast(f"Purchased {len(unowned)} recipes!")
+                st.rerun()
+        
         col1, col2 = st.columns(2)
         
-        for i, r in enumerate(DataRepository.RECIPES):
+        for i, r in enumerate(recipes):
             target_col = col1 if i % 2 == 0 else col2
             with target_col:
                 with st.container():
-                    st.image(r['img'], use_container_width=True)
+                    st.image(str(DataRepository.recipe_image(r, columns=2)), use_container_width=True)
                     st.markdown(f"#### {r['title']}")
                     st.caption(r['desc'])
                     
-                    is_owned = r['id'] in st.session_state.inventory
+                    is_owned = r['id'] in inventory
                     
                     if is_owned:
                         st.success("Owned")
@@ -459,47 +2690,105 @@ class Views:
                             for x in r['ing']: st.write(f"• {x}")
                     else:
                         if st.button(f"Buy £{r['price']}", key=r['id']):
-                            st.session_state.inventory.add(r['id'])
-                            # Add to shopping list
-                            for ing in r['ing']:
-                                if ing not in st.session_state.shopping_list:
-                                    st.session_state.shopping_list.append(ing)
+                            # Records ownership and merges ingredients into the shopping list
+                            store.add_purchases(uid, [r])
                             st.toast(f"Purchased {r['title']}!")
                             st.rerun()
                             
         st.markdown("### 🛒 Smart Shopping List")
-        if not st.session_state.shopping_list:
+        total = store.shopping_count(uid)
+        shown = st.session_state.get('shopping_limit', AppConfig.SHOPPING_PAGE_SIZE)
+        if not total:
             st.info("Your list is empty. Buy a recipe to populate it.")
         else:
-            for item in st.session_state.shopping_list:
+            matcher = DataRepository.sponsor_matcher()
+            titles = {r['id']: r['title'] for r in recipes}
+            page = store.shopping_list(uid, limit=shown)
+            for item in page:
                 c1, c2 = st.columns([1, 3])
-                with c1: st.checkbox(item, key=f"chk_{item}")
+                with c1: st.checkbox(item.name if item.qty == 1 else f"{item.name} × {item.qty}", key=f"chk_{item.name}")
                 with c2:
+                    st.caption("For " + ", ".join(titles.get(src, src) for src in item.sources))
                     # Sponsor Integration Logic
-                    for key, sponsor in DataRepository.SPONSORS.items():
-                        if key in item:
-                            st.markdown(f"<span style='background:{sponsor['color']}; padding:4px 8px; border-radius:6px; font-size:0.8rem; color:#333;'>🎁 <b>{sponsor['name']}</b>: {sponsor['code']}</span>", unsafe_allow_html=True)
+                    for key in matcher.matches(item.name):
+                        sponsor = DataRepository.SPONSORS[key]
+                        st.markdown(f"<span style='background:{sponsor['color']}; padding:4px 8px; border-radius:6px; font-size:0.8rem; color:#333;'>🎁 <b>{sponsor['name']}</b>: {sponsor['code']}</span>", unsafe_allow_html=True)
+            checked = [item.name for item in page if st.session_state.get(f"chk_{item.name}")]
+            if checked and st.button(f"🧹 Remove {len(checked)} checked"):
+                store.remove_shopping_items(uid, checked)
+                for name in checked:
+                    del st.session_state[f"chk_{name}"]
+                st.rerun()
+            if total > shown:
+                if st.button(f"Show more ({total - shown} remaining)"):
+                    st.session_state.shopping_limit = shown + AppConfig.SHOPPING_PAGE_SIZE
+                    st.rerun()
+
+    @staticmethod
+    def chart_grain(span_days):
+        """Coarsest-needed bucket so `span_days` fits in AppConfig.CHART_MAX_POINTS bars."""
+        if span_days <= AppConfig.CHART_MAX_POINTS: return "day"
+        if span_days // 7 <= AppConfig.CHART_MAX_POINTS: return "week"
+        return "month"
 
     @staticmethod
     def render_stats():
+        import pandas as pd
         st.title("Your Progress 📈")
         
-        # Generate dummy data if empty
-        if not st.session_state.history:
+        uid = st.session_state.user['id']
+        store = DataRepository.user_store()
+        
+        today = datetime.date.today()
+        streaks, week = store.streaks(uid, today), store.week_totals(uid, today)
+        s1, s2, s3, s4 = st.columns(4)
+        s1.metric("Current Streak", f"{streaks['current']} Days")
+        s2.metric("Longest Streak", f"{streaks['longest']} Days")
+        s3.metric("This Week", f"{week['minutes']} min", f"{week['sessions']} workouts", delta_color="off")
+        s4.metric("Water This Week", f"{week['cups']} Cups")
+        
+        # Only the visible range is queried, pre-aggregated to at most CHART_MAX_POINTS bars
+        span = st.radio("Range", list(AppConfig.STATS_RANGES), horizontal=True, label_visibility="collapsed")
+        days = AppConfig.STATS_RANGES[span]
+        first = store.first_workout_date(uid)
+        start = today - datetime.timedelta(days=days) if days else first
+        grain = Views.chart_grain((today - start).days if start else 0)
+        rows = store.rollups(uid, start=start, grain=grain) if first else []
+        
+        # Generate dummy data if the user has never logged a workout
+        if first is None:
             df = pd.DataFrame({
                 "Date": pd.date_range(start=datetime.date.today()-datetime.timedelta(days=7), periods=7),
                 "Minutes": [random.randint(0, 45) for _ in range(7)]
             })
+        elif not rows:
+            # Real history, none of it in this range: an honest zero across the range's span
+            st.caption(f"No workouts in this range ({span}).")
+            df = pd.DataFrame({"Date": pd.to_datetime([start, today]), "Minutes": [0, 0]})
         else:
-            df = pd.DataFrame(st.session_state.history)
+            df = pd.DataFrame({
+                "Date": pd.to_datetime([r[0] for r in rows]),
+                "Minutes": [r[1] for r in rows]
+            })
             
         st.bar_chart(df, x="Date", y="Minutes", color=AppConfig.ACCENT_COLOR)
         
         st.markdown("#### Journal")
-        entry = st.text_area("How are you feeling today?", placeholder="Type here...")
-        if st.button("Save Entry"):
+        st.caption(f"{week['entries']} {'entry' if week['entries'] == 1 else 'entries'} this week")
+        st.text_area("How are you feeling today?", placeholder="Type here...", key="journal_draft")
+        # Saved in the callback, before the rerun reads this week's totals, so the caption includes it
+        st.button("Save Entry", on_click=Views._save_journal, args=(uid,))
+        if st.session_state.pop('journal_saved', False):
             st.toast("Journal entry saved securely.")
 
+    @staticmethod
+    def _save_journal(uid):
+        entry = st.session_state.journal_draft.strip()
+        if entry:
+            DataRepository.user_store().add_journal_entry(uid, datetime.date.today(), entry)
+            st.session_state.journal_draft = ""
+            st.session_state.journal_saved = True
+
     @staticmethod
     def render_settings():
         st.title("Preferences ⚙️")
@@ -511,10 +2800,88 @@ class Views:
             st.rerun()
             
         st.markdown("---")
+        Views.render_backup()
+
+        st.markdown("---")
+        st.subheader("Profile")
+        st.caption("Bookmark this page, or keep this link, to get back to your profile and history "
+                   "after a restart or on another device. Anyone with the link can open the profile.")
+        st.code(f"?profile={st.session_state.user['id']}", language=None)
         if st.button("Reset Profile Data", type="secondary"):
+            DataRepository.user_store().delete_user(st.session_state.user['id'])
             st.session_state.clear()
+            st.query_params.pop("profile", None)
             st.rerun()
 
+        if st.query_params.get("debug") == "1":
+            Views.render_debug_panel()
+
+    @staticmethod
+    def render_backup():
+        st.subheader("Backup")
+        st.caption("Your workouts, water log and journal as one Parquet file, to keep or to restore on another FitBod.")
+        uid = st.session_state.user['id']
+        store = DataRepository.user_store()
+
+        if st.button("📦 Prepare backup"):
+            out = io.BytesIO()
+            counts = HistoryArchive.export(store, uid, out)
+            st.session_state.backup = out.getvalue()
+            st.caption(f"{counts['workout']} workouts, {counts['water']} water logs, {counts['journal']} journal entries")
+        if st.session_state.get('backup'):
+            st.download_button("⬇️ Download backup", st.session_state.backup,
+                               file_name=f"fitbod-history-{datetime.date.today().isoformat()}.parquet",
+                               mime="application/vnd.apache.parquet", on_click=lambda: st.session_state.pop('backup', None))
+
+        # A new uploader key after each restore clears the file, so a second click can't import it again
+        generation = st.session_state.get('backup_upload', 0)
+        upload = st.file_uploader("Restore from a backup", type=["parquet"], key=f"backup_upload_{generation}")
+        replace = st.toggle("Replace my current history (otherwise entries are added to it)", value=False)
+        if upload is not None and st.button("Restore"):
+            import pyarrow as pa
+            try:
+                counts = HistoryArchive.restore(store, uid, upload, replace=replace)
+            except (ValueError, OSError, pa.ArrowException) as e:
+                st.error(f"Couldn't read that file: {e}")
+            else:
+                st.session_state.backup_upload = generation + 1
+                st.session_state.backup_restored = (f"Restored {counts.get('workout', 0)} workouts, "
+                                                    f"{counts.get('water', 0)} water logs and "
+                                                    f"{counts.get('journal', 0)} journal entries.")
+                st.rerun()
+        restored = st.session_state.pop('backup_restored', None)
+        if restored:
+            st.success(restored)
+
+    @staticmethod
+    def render_debug_panel():
+        """Hidden diagnostics (Config page with ?debug=1): live metrics and their dumps."""
+        metrics = Metrics.registry()
+        st.markdown("---")
+        st.subheader("Diagnostics 🛠")
+        metrics.enabled = st.toggle("Collect metrics (all sessions)", value=metrics.enabled)
+
+        snap = metrics.snapshot()
+        labels = lambda entry: ", ".join(f"{k}={v}" for k, v in entry["labels"].items())
+        ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+        if snap["histograms"]:
+            st.dataframe([{
+                "metric": h["name"], "labels": labels(h), "count": h["count"],
+                "mean ms": ms(h["sum"] / h["count"]), "p50 ms ≤": ms(h["p50"]), "p95 ms ≤": ms(h["p95"]),
+            } for h in snap["histograms"]], hide_index=True, use_container_width=True)
+        if snap["counters"]:
+            st.dataframe([{"metric": c["name"], "labels": labels(c), "value": c["value"]} for c in snap["counters"]],
+                         hide_index=True, use_container_width=True)
+        caches = {"candidate pools": ExerciseEngine.index().pools.stats(), "tts": AccessibilityManager.tts_cache().stats()}
+        st.dataframe([{"cache": name, **stats} for name, stats in caches.items()], hide_index=True, use_container_width=True)
+        if not (snap["histograms"] or snap["counters"]):
+            st.caption("Nothing recorded yet." if metrics.enabled else "Collection is off (FITBOD_METRICS=1 enables it at startup).")
+
+        c1, c2, c3 = st.columns(3)
+        c1.download_button("Prometheus text", metrics.prometheus(), "fitbod_metrics.prom", "text/plain")
+        c2.download_button("JSON", json.dumps(snap, indent=2), "fitbod_metrics.json", "application/json")
+        c3.button("Reset metrics", on_click=metrics.reset)
+
 # ==========================================
 # 6. MAIN APPLICATION ENTRY
 # ==========================================
@@ -525,33 +2892,42 @@ def main():
     # State Initialization
     if 'user' not in st.session_state: st.session_state.user = None
     if 'page' not in st.session_state: st.session_state.page = "onboarding"
+    # A new session (restart, new tab) picks its profile back up from the ?profile= link
+    if not st.session_state.user and st.query_params.get("profile"):
+        st.session_state.user = DataRepository.user_store().profile(st.query_params["profile"])
+        if st.session_state.user and st.session_state.page == "onboarding": st.session_state.page = "home"
+    # Profiles created before ids existed start a fresh store rather than share one keyed on a name
+    if st.session_state.user and 'id' not in st.session_state.user:
+        st.session_state.user['id'] = uuid.uuid4().hex
+        DataRepository.user_store().save_profile(st.session_state.user['id'], st.session_state.user)
+    # Keep the profile in the URL so a bookmark or reload finds it again
+    if st.session_state.user and st.query_params.get("profile") != st.session_state.user['id']:
+        st.query_params["profile"] = st.session_state.user['id']
     if 'high_contrast' not in st.session_state: st.session_state.high_contrast = False
-    if 'streak' not in st.session_state: st.session_state.streak = 0
-    if 'hydration' not in st.session_state: st.session_state.hydration = 0
     if 'active_workout' not in st.session_state: st.session_state.active_workout = None
-    if 'inventory' not in st.session_state: st.session_state.inventory = set()
-    if 'shopping_list' not in st.session_state: st.session_state.shopping_list = []
-    if 'history' not in st.session_state: st.session_state.history = []
+    # Re-set every run so the slider's value survives pages that don't render it
+    st.session_state.session_minutes = st.session_state.get('session_minutes', AppConfig.SESSION_MINUTES)
 
     # Inject Design System
     DesignSystem.inject_css(st.session_state.high_contrast)
 
-    # Routing
-    if not st.session_state.user:
-        Views.render_onboarding()
-    else:
-        Views.render_nav()
-        
-        page = st.session_state.page
-        if page == "home": Views.render_dashboard()
-        elif page == "library": Views.render_dashboard() # Reusing dashboard for workout focus
-        elif page == "food": Views.render_nutrition()
-        elif page == "stats": Views.render_stats()
-        elif page == "partners": 
-            st.title("Partners 🤝")
-            st.info("Exclusive discounts for FitBod members.")
-            st.write("**ProteinPlus**: Use code PRO20 for 20% off.")
-        elif page == "settings": Views.render_settings()
+    # Routing (timed per view; a no-op unless metrics are enabled)
+    page = st.session_state.page if st.session_state.user else "onboarding"
+    with Metrics.registry().timer("fitbod_view_seconds", view=page):
+        if not st.session_state.user:
+            Views.render_onboarding()
+        else:
+            Views.render_nav()
+
+            if page == "home": Views.render_dashboard()
+            elif page == "library": Views.render_library()
+            elif page == "food": Views.render_nutrition()
+            elif page == "stats": Views.render_stats()
+            elif page == "partners": 
+                st.title("Partners 🤝")
+                st.info("Exclusive discounts for FitBod members.")
+                st.write("**ProteinPlus**: Use code PRO20 for 20% off.")
+            elif page == "settings": Views.render_settings()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+"""Dashboard figures vs history length: incremental aggregates vs rescanning the log.
+
+    python benchmarks/bench_activity.py [--quick]
+
+Seeds a SQLite store with a mixed activity log (workouts, water, journal
+entries) of growing length and times, per size, appending one event and
+reading the dashboard figures (streak, today's water, this week's totals).
+"legacy" computes the same figures by rescanning the raw logs, as a
+history-scanning implementation would; it grows with the log while the
+aggregate read should stay flat.
+"""
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import app, timeit
+
+USER = "bench"
+
+
+def seed(store, n, today):
+    rng = random.Random(0)
+    start = today - datetime.timedelta(days=max(n // 10, 1))
+    for day in sorted(start + datetime.timedelta(days=rng.randrange((today - start).days + 1)) for _ in range(n)):
+        kind = rng.random()
+        if kind < 0.5:
+            store.log_workout(USER, day, rng.randint(5, 60))
+        elif kind < 0.9:
+            store.log_water(USER, day)
+        else:
+            store.add_journal_entry(USER, day, "feeling good")
+    store.flush()
+
+
+def aggregates(store, today):
+    return store.streaks(USER, today), store.day_totals(USER, today), store.week_totals(USER, today)
+
+
+def rescan(store, today):
+    """The same figures from the raw logs: the cost an O(history) dashboard pays per render."""
+    conn, day = store._conn, today.isoformat()
+    week = (today - datetime.timedelta(days=today.weekday())).isoformat()
+    dates = [datetime.date.fromisoformat(d) for d, in
+             conn.execute("SELECT DISTINCT date FROM workouts WHERE user = ? ORDER BY date DESC", (USER,))]
+    streak, expected = 0, today
+    for d in dates:
+        if d == expected or (streak == 0 and d == today - datetime.timedelta(days=1)):
+            streak, expected = streak + 1, d - datetime.timedelta(days=1)
+        elif d < expected:
+            break
+    cups = conn.execute("SELECT COALESCE(SUM(cups), 0) FROM water_log WHERE user = ? AND date = ?", (USER, day)).fetchone()
+    weekly = conn.execute("SELECT COALESCE(SUM(minutes), 0), COUNT(*) FROM workouts WHERE user = ? AND date >= ?",
+                          (USER, week)).fetchone()
+    return streak, cups, weekly
+
+
+def run(quick=False):
+    sizes = [1_000, 10_000] if quick else [1_000, 10_000, 100_000]
+    today = datetime.date.today()
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for n in sizes:
+            store = app.SQLiteUserStore(os.path.join(data_dir, f"activity{n}.db"), batch_size=5_000)
+            seed(store, n, today)
+            t = time.perf_counter()
+            for _ in range(200):
+                store.log_water(USER, today)
+                store.flush()
+            append_us = (time.perf_counter() - t) * 1e6 / 200
+            results.append({
+                "events": n,
+                "append_flush_us": round(append_us, 1),
+                "read_us": round(timeit(lambda: aggregates(store, today), repeat=50) * 1000, 1),
+                "legacy_rescan_us": round(timeit(lambda: rescan(store, today), repeat=20) * 1000, 1),
+            })
+            store.flush()
+            store._conn.close()
+    return {"activity": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
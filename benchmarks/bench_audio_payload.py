@@ -0,0 +1,41 @@
+"""Per-rerun page payload of the dashboard in high-contrast mode: inline base64 audio vs by-reference.
+
+    python benchmarks/bench_audio_payload.py
+
+Uses the offline stub synthesizer and throwaway data and cache directories.
+"""
+import json
+import os
+import tempfile
+import time
+
+from common import DEMO_USER, app_test, payload_bytes, seeded_run
+
+
+def run(quick=False):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as cache_dir:
+        os.environ.update(FITBOD_TTS_ENGINE="stub", FITBOD_DATA_DIR=data_dir, FITBOD_CACHE_DIR=cache_dir)
+        try:
+            for mode in ("inline", "reference"):
+                os.environ["FITBOD_AUDIO_DELIVERY"] = mode
+                at = app_test(user=DEMO_USER, page="home", high_contrast=True)
+                # Clips are synthesized in the background; measure once players replace the placeholders
+                for _ in range(50):
+                    seeded_run(at)
+                    assert not at.exception, at.exception
+                    if not any("Preparing audio" in m.value for m in at.markdown):
+                        break
+                    time.sleep(0.1)
+                first = payload_bytes(at)
+                seeded_run(at)
+                results[mode] = {"first_render_bytes": first, "rerun_bytes": payload_bytes(at)}
+        finally:
+            for key in ("FITBOD_TTS_ENGINE", "FITBOD_DATA_DIR", "FITBOD_CACHE_DIR", "FITBOD_AUDIO_DELIVERY"):
+                os.environ.pop(key, None)
+    results["rerun_reduction"] = round(1 - results["reference"]["rerun_bytes"] / results["inline"]["rerun_bytes"], 3)
+    return {"audio_payload": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,38 @@
+"""Throughput of `ExerciseEngine.generate_plans` (profiles/sec) by worker count.
+
+    python benchmarks/bench_batch.py [--quick]
+"""
+import json
+import os
+import sys
+import time
+
+from common import app, synthetic_catalog, synthetic_profiles
+
+
+def run(quick=False):
+    catalog = synthetic_catalog(2_000 if quick else 20_000, seed=7)
+    profiles = synthetic_profiles(2_000 if quick else 10_000, seed=7)
+    index = app.CatalogIndex(catalog)
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, min(4, cores), cores})
+
+    reference = None
+    results = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        plans = app.ExerciseEngine.generate_plans(profiles, seed=42, index=index, workers=workers, chunk_size=1_000)
+        elapsed = time.perf_counter() - start
+        ids = [[ex['id'] for ex in plan] for plan in plans]
+        reference = reference or ids
+        results.append({
+            "workers": workers,
+            "profiles": len(profiles),
+            "profiles_per_sec": round(len(profiles) / elapsed),
+            "reproducible": ids == reference,
+        })
+    return {"batch": {"catalog_size": len(catalog), "cpu_count": cores, "runs": results}}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,67 @@
+"""Catalog memory and access cost: in-code dicts vs lazily loaded JSONL records.
+
+    python benchmarks/bench_catalog.py [--quick]
+
+Reports traced Python heap per 10k entries for a list of dicts, fully
+materialized `ExerciseRecord`s and a `LazyCatalog` (offsets only), plus open
+time and random-access latency for the lazy catalog.
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import app, synthetic_catalog, timeit
+
+
+def traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def run(quick=False):
+    n = 20_000 if quick else 200_000
+    per_10k = 10_000 / n
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "exercises.jsonl")
+        with open(path, "w") as f:
+            for ex in synthetic_catalog(n, seed=3):
+                f.write(json.dumps(ex, separators=(",", ":")) + "\n")
+
+        lines = open(path).read().splitlines()
+        dicts, dict_bytes = traced_bytes(lambda: [json.loads(line) for line in lines])
+        del dicts
+        records, record_bytes = traced_bytes(lambda: [app.ExerciseRecord(**json.loads(line)) for line in lines])
+        del records, lines
+
+        _, lazy_bytes = traced_bytes(lambda: app.LazyCatalog(path, app.ExerciseRecord))
+        start = time.perf_counter()
+        lazy = app.LazyCatalog(path, app.ExerciseRecord)
+        open_ms = (time.perf_counter() - start) * 1000
+        rng = random.Random(0)
+        picks = [rng.randrange(n) for _ in range(1_000)]
+        access_us = timeit(lambda: [lazy[i]['title'] for i in picks], repeat=5) * 1000 / len(picks)
+        index_ms = timeit(lambda: app.CatalogIndex(lazy), repeat=1)
+
+        return {"catalog": {
+            "entries": n,
+            "file_bytes_per_10k": round(os.path.getsize(path) * per_10k),
+            "dict_list_bytes_per_10k": round(dict_bytes * per_10k),
+            "slots_records_bytes_per_10k": round(record_bytes * per_10k),
+            "lazy_catalog_bytes_per_10k": round(lazy_bytes * per_10k),
+            "lazy_open_ms": round(open_ms, 1),
+            "lazy_random_access_us": round(access_us, 2),
+            "index_build_from_lazy_ms": round(index_ms, 1),
+        }}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,28 @@
+"""Theme stylesheet report: size raw vs minified, cold compile vs cached lookup vs `inject_css`.
+
+    python benchmarks/bench_css.py
+"""
+import json
+import sys
+
+from common import app, timeit
+
+
+def run(quick=False):
+    design = app.DesignSystem
+    results = {}
+    for name, theme in design.THEMES.items():
+        raw = design.build_css(theme)
+        results[name] = {
+            "raw_bytes": len(raw.encode()),
+            "minified_bytes": len(design.stylesheet(name).encode()),
+            "compile_ms": round(timeit(lambda: design.minify(design.build_css(theme)), repeat=20), 4),
+            "cached_lookup_ms": round(timeit(lambda: design.stylesheet(name), repeat=20, number=100), 5),
+            # Outside `streamlit run` the element is built but not sent anywhere
+            "inject_ms": round(timeit(lambda: design.inject_css(theme=name), repeat=20, number=10), 4),
+        }
+    return {"css": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
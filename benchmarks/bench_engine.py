@@ -0,0 +1,70 @@
+"""Scaling benchmark: indexed `ExerciseEngine.generate_plan` vs the original per-exercise loop.
+
+    python benchmarks/bench_engine.py [--quick]
+
+`uncached_plan_ms` recomputes the candidate pool every call; `indexed_plan_ms`
+reuses the per-profile pools cached on the index, as repeat requests do.
+tests/test_engine.py checks the index against `legacy_candidates`.
+"""
+import json
+import random
+import sys
+
+from common import app, synthetic_catalog, synthetic_profiles, timeit
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+QUICK_SIZES = [10, 100, 1_000, 10_000]
+
+
+def legacy_candidates(catalog, profile):
+    """The pre-index filter, kept verbatim as the reference implementation."""
+    disability = profile.get('disability', [])
+    goal = profile.get('goal', 'General')
+    candidates = []
+    for ex in catalog:
+        score = 0
+        if "Bed-Bound" in disability and "Bed-Bound" not in ex['tags']: continue
+        if "Wheelchair User" in disability and "Wheelchair User" not in ex['tags'] and "Upper Body" not in ex['tags'] and "Cardio" not in ex['tags']: continue
+        if any(t in ex['tags'] for t in disability): score += 10
+        if goal in ex['tags'] or goal in ex['cat']: score += 5
+        if score > 0:
+            candidates.append(ex)
+    return candidates
+
+
+def legacy_plan(catalog, profile):
+    candidates = legacy_candidates(catalog, profile)
+    random.shuffle(candidates)
+    return candidates[:3] if len(candidates) >= 3 else candidates
+
+
+def run(quick=False):
+    profiles = synthetic_profiles(50, seed=1)
+    results = []
+    for n in (QUICK_SIZES if quick else SIZES):
+        catalog = synthetic_catalog(n, seed=n)
+        index = app.CatalogIndex(catalog)
+
+        def uncached():
+            for p in profiles:
+                index.pools = app.CandidateCache()
+                app.ExerciseEngine.generate_plan(p, index=index)
+
+        legacy_ms = timeit(lambda: [legacy_plan(catalog, p) for p in profiles], repeat=3) / len(profiles)
+        uncached_ms = timeit(uncached, repeat=3) / len(profiles)
+        index.pools = app.CandidateCache()
+        indexed_ms = timeit(lambda: [app.ExerciseEngine.generate_plan(p, index=index) for p in profiles], repeat=3) / len(profiles)
+        results.append({
+            "catalog_size": n,
+            "index_build_ms": round(timeit(lambda: app.CatalogIndex(catalog), repeat=3), 3),
+            "legacy_plan_ms": round(legacy_ms, 4),
+            "uncached_plan_ms": round(uncached_ms, 4),
+            "indexed_plan_ms": round(indexed_ms, 4),
+            "speedup": round(legacy_ms / indexed_ms, 1),
+            "pool_hit_rate": index.pools.stats()["hit_rate"],
+        })
+    return {"engine": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,104 @@
+"""History backup: chunked Parquet export/restore vs a whole-history JSON dump.
+
+    python benchmarks/bench_history.py [--quick]
+
+Seeds a SQLite store with years of history per size (each day: two workouts,
+six water logs, one journal entry) and compares, per size, wall time, file
+size and peak Python heap (tracemalloc) of `HistoryArchive` against the
+legacy approach of collecting every record into one JSON document.
+Parquet's peak is set by the chunk size and stays flat as the history
+grows; JSON's grows with it. Arrow's own buffers are reported separately
+as the pool's high-water mark.
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from common import app, timeit
+
+SIZES = [50_000, 200_000]
+QUICK_SIZES = [20_000, 50_000]
+PER_DAY = 9
+
+
+def populate(store, user, rows):
+    days = rows // PER_DAY
+    start = datetime.date(2026, 1, 1) - datetime.timedelta(days=days)
+    workouts, water, journal = [], [], []
+    for d in range(days):
+        day = (start + datetime.timedelta(days=d)).isoformat()
+        workouts += [(day, 10 + d % 30, None), (day, 5 + d % 7, None)]
+        water += [(day, 1, None)] * 6
+        journal.append((day, None, f"Day {d}: felt {'good' if d % 3 else 'tired'}, slept {6 + d % 3} hours."))
+    for kind, records in (("workout", workouts), ("water", water), ("journal", journal)):
+        for k in range(0, len(records), 50_000):
+            store.import_records(user, kind, records[k:k + 50_000])
+    return days * PER_DAY
+
+
+def legacy_export(store, user, path):
+    data = {kind: [] for kind in app.HistoryArchive.KINDS}
+    for kind, rows in store.iter_records(user):
+        data[kind] += [{"date": d, "value": v, "text": t} for d, v, t in rows]
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def legacy_restore(store, user, path):
+    with open(path) as f:
+        data = json.load(f)
+    for kind, rows in data.items():
+        store.import_records(user, kind, [(r["date"], r["value"], r["text"]) for r in rows])
+
+
+def peak_bytes(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(quick=False):
+    import pyarrow as pa
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (QUICK_SIZES if quick else SIZES):
+            store = app.SQLiteUserStore(os.path.join(tmp, f"history{n}.db"))
+            rows = populate(store, "bench", n)
+            parquet, js = os.path.join(tmp, f"h{n}.parquet"), os.path.join(tmp, f"h{n}.json")
+            targets = iter(range(1_000))
+            app.HistoryArchive.export(store, "bench", parquet)  # imports pyarrow outside the traced runs
+
+            parquet_peak = peak_bytes(lambda: app.HistoryArchive.export(store, "bench", parquet))
+            json_peak = peak_bytes(lambda: legacy_export(store, "bench", js))
+            restore_peak = peak_bytes(lambda: app.HistoryArchive.restore(store, f"p{next(targets)}", parquet))
+            legacy_restore_peak = peak_bytes(lambda: legacy_restore(store, f"j{next(targets)}", js))
+            assert store.workout_count("p0") == store.workout_count("j1") == store.workout_count("bench")
+            assert store.journal("p0", limit=5) == store.journal("bench", limit=5)
+
+            results.append({
+                "rows": rows,
+                "years": round(rows / PER_DAY / 365, 1),
+                "export_ms": round(timeit(lambda: app.HistoryArchive.export(store, "bench", parquet), repeat=3), 1),
+                "legacy_json_export_ms": round(timeit(lambda: legacy_export(store, "bench", js), repeat=3), 1),
+                "restore_ms": round(timeit(lambda: app.HistoryArchive.restore(store, f"p{next(targets)}", parquet), repeat=1), 1),
+                "legacy_json_restore_ms": round(timeit(lambda: legacy_restore(store, f"j{next(targets)}", js), repeat=1), 1),
+                "file_bytes": os.path.getsize(parquet),
+                "legacy_json_file_bytes": os.path.getsize(js),
+                "export_peak_kb": round(parquet_peak / 1024),
+                "legacy_json_export_peak_kb": round(json_peak / 1024),
+                "restore_peak_kb": round(restore_peak / 1024),
+                "legacy_json_restore_peak_kb": round(legacy_restore_peak / 1024),
+                "arrow_pool_peak_kb": round(pa.default_memory_pool().max_memory() / 1024),
+            })
+            store.flush()
+    return {"history": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,48 @@
+"""Recipe image pipeline: bytes per size variant vs the source, cold render vs cached lookup.
+
+    python benchmarks/bench_images.py [--quick]
+
+Uses a synthetic 1600x1200 photo-like source (seeded noise over a gradient)
+and the generated placeholder, in throwaway directories.
+"""
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+from common import app, timeit
+
+
+def synthetic_photo(path, seed=0):
+    from PIL import Image, ImageFilter
+    rng = random.Random(seed)
+    noise = Image.frombytes("RGB", (400, 300), bytes(rng.getrandbits(8) for _ in range(400 * 300 * 3)))
+    base = Image.linear_gradient("L").convert("RGB").resize((1600, 1200))
+    Image.blend(base, noise.resize((1600, 1200)).filter(ImageFilter.GaussianBlur(2)), 0.5).save(path, quality=90)
+
+
+def run(quick=False):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = Path(tmp) / "recipes"
+        sources.mkdir()
+        synthetic_photo(sources / "photo.jpg")
+        results["source_bytes"] = (sources / "photo.jpg").stat().st_size
+        for name, title in (("photo", ""), ("placeholder", "Power Protein Oats")):
+            for variant in app.ImagePipeline.VARIANTS:
+                rounds = iter(range(1_000_000))
+                # A fresh cache directory per call makes every render cold
+                cold = lambda: app.ImagePipeline(sources, Path(tmp) / f"cold{next(rounds)}").variant(name, variant, title=title)
+                pipeline = app.ImagePipeline(sources, Path(tmp) / "warm")
+                path = pipeline.variant(name, variant, title=title)
+                results[f"{name}.{variant}"] = {
+                    "bytes": path.stat().st_size,
+                    "cold_ms": round(timeit(cold, repeat=3 if quick else 7), 2),
+                    "cached_us": round(timeit(lambda: pipeline.variant(name, variant, title=title), repeat=5, number=200) * 1000, 2),
+                }
+    return {"images": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
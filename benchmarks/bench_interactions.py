@@ -0,0 +1,60 @@
+"""Server-side time per dashboard/nav interaction, driven through AppTest.
+
+    python benchmarks/bench_interactions.py [--quick] [--app PATH]
+
+Each sample is the wall time of one click -> run, including any blocking
+sleeps and follow-up st.rerun() passes. `--app` measures another copy of the
+app (e.g. `git show <rev>:app.py > /tmp/old_app.py`) for before/after runs.
+AppTest replays fragment-scoped reruns as full runs, so numbers for
+fragment-local interactions (water, shuffle) are an upper bound.
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from common import DEMO_USER, ROOT
+
+INTERACTIONS = [
+    ("nav_stats", "📊 Stats"),
+    ("nav_home", "🏠 Home"),
+    ("log_water", "💧 Log Water"),
+    ("shuffle", "🔄 Shuffle Routine"),
+    ("complete_workout", "✅ Complete Workout"),
+]
+
+
+def click(at, label):
+    button = next(b for b in at.button if b.label == label)
+    start = time.perf_counter()
+    button.click().run()
+    elapsed = (time.perf_counter() - start) * 1000
+    assert not at.exception, at.exception
+    return elapsed
+
+
+def run(quick=False, app_path=None):
+    from streamlit.testing.v1 import AppTest
+
+    rounds = 2 if quick else 5
+    samples = {name: [] for name, _ in INTERACTIONS}
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ["FITBOD_DATA_DIR"] = data_dir
+        try:
+            at = AppTest.from_file(str(app_path or ROOT / "app.py"), default_timeout=60)
+            at.session_state["user"] = DEMO_USER
+            at.session_state["page"] = "home"
+            at.run()
+            for _ in range(rounds):
+                for name, label in INTERACTIONS:
+                    samples[name].append(click(at, label))
+        finally:
+            os.environ.pop("FITBOD_DATA_DIR", None)
+    return {"interactions_ms": {name: round(statistics.median(v), 1) for name, v in samples.items()}}
+
+
+if __name__ == "__main__":
+    app_path = sys.argv[sys.argv.index("--app") + 1] if "--app" in sys.argv else None
+    print(json.dumps(run(quick="--quick" in sys.argv, app_path=app_path), indent=2))
@@ -0,0 +1,82 @@
+"""Plan optimizer: time per plan and how well plans use the budget, by catalog size and session length.
+
+    python benchmarks/bench_optimizer.py [--quick]
+
+Pools are warm (cached per profile, as for repeat requests), so `plan_ms`
+(mean) and `p95_ms` / `max_ms` (over every single plan) are the optimizer
+itself; `pool_build_ms` is the one-off cost of a new profile's pool and
+`cold_p95_ms` a first request's pool build plus plan. `fill` is the mean
+share of the session filled (profiles with candidates) and `categories` the
+mean distinct categories per plan. `optimizer_within_target` holds when the
+p95 of every budget, warm and cold, is within TARGET_MS at every size (run.py
+fails otherwise). Plan correctness is covered by tests/test_engine.py.
+"""
+import json
+import random
+import statistics
+import sys
+import time
+
+from common import app, synthetic_catalog, synthetic_profiles, timeit
+
+SIZES = [1_000, 10_000, 50_000]
+QUICK_SIZES = [1_000, 10_000]
+BUDGETS = [15, 30, 60, 120]  # up to PlanOptimizer.max_minutes
+TARGET_MS = 5.0  # p95 per plan at 50k exercises
+
+
+def plan_times(fn, profiles, rounds):
+    """Wall time in ms of every single `fn(profile)` call, `rounds` passes over the profiles."""
+    samples = []
+    for _ in range(rounds):
+        for p in profiles:
+            start = time.perf_counter()
+            fn(p)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summary(samples):
+    return {"plan_ms": round(statistics.mean(samples), 3),
+            "p95_ms": round(statistics.quantiles(samples, n=20, method="inclusive")[-1], 3),
+            "max_ms": round(max(samples), 3)}
+
+
+def run(quick=False):
+    profiles = synthetic_profiles(10 if quick else 30, seed=3)
+    rounds = 2 if quick else 5
+    results = []
+    for n in (QUICK_SIZES if quick else SIZES):
+        index = app.CatalogIndex(synthetic_catalog(n, seed=n))
+        pool_ms = timeit(lambda: [app.CandidatePool(index, *index.candidate_scores(p['disability'], p['goal']))
+                                  for p in profiles], repeat=3) / len(profiles)
+        # A new profile: pool build + plan, on a fresh pool cache each time
+        cold = []
+        for p in profiles:
+            index.pools = app.CandidateCache()
+            start = time.perf_counter()
+            app.ExerciseEngine.generate_plan(p, index=index, rng=random.Random(0))
+            cold.append((time.perf_counter() - start) * 1000)
+        row = {"catalog_size": n, "pool_build_ms": round(pool_ms, 3),
+               "cold_p95_ms": round(statistics.quantiles(cold, n=20, method="inclusive")[-1], 3)}
+        for minutes in BUDGETS:
+            fill, cats = [], []
+            for k, p in enumerate(profiles):
+                plan = app.ExerciseEngine.generate_plan(p, index=index, rng=random.Random(k), minutes=minutes)
+                if plan:  # some profiles (e.g. Bed-Bound + Wheelchair User) have no candidates
+                    fill.append(sum(ex['mins'] for ex in plan) / minutes)
+                    cats.append(len({ex['cat'] for ex in plan}))
+            samples = plan_times(lambda p: app.ExerciseEngine.generate_plan(p, index=index, minutes=minutes),
+                                 profiles, rounds)
+            row[f"{minutes}min"] = {**summary(samples), "fill": round(statistics.mean(fill), 3),
+                                    "categories": round(statistics.mean(cats), 2)}
+        row["300kcal"] = summary(plan_times(lambda p: app.ExerciseEngine.generate_plan(p, index=index, calories=300),
+                                            profiles, rounds))
+        results.append(row)
+    worst = max([v["p95_ms"] for row in results for v in row.values() if isinstance(v, dict)]
+                + [row["cold_p95_ms"] for row in results])
+    return {"optimizer": results, "optimizer_within_target": worst <= TARGET_MS}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,51 @@
+"""Library search: SearchIndex vs a linear substring scan, by catalog size.
+
+    python benchmarks/bench_search.py [--quick]
+
+Queries mimic search-as-you-type (one letter, a partial word, two words,
+a substring that starts no word) plus a faceted query. Each timing is a full
+`search()` call: ranking the top page and counting category/tag facets.
+`legacy_scan_ms` is the naive per-exercise scan it replaces, kept as the
+reference for the match totals checked in tests/test_search.py.
+"""
+import json
+import sys
+
+from common import app, synthetic_catalog, timeit
+
+SIZES = [1_000, 10_000, 100_000]
+QUICK_SIZES = [1_000, 10_000]
+QUERIES = {"letter": "s", "prefix": "upp", "two_words": "core str", "substring": "ovemen", "empty": ""}
+FACETED = {"query": "step", "categories": ["Core"], "tags": ["Balance"]}
+
+
+def legacy_search(catalog, query, categories=(), tags=()):
+    words = query.casefold().split()
+    hits = []
+    for i, ex in enumerate(catalog):
+        text = " ".join([ex['title'], ex['cat'], *ex['tags'], *ex['ins']]).casefold()
+        if all(w in text for w in words) and (not categories or ex['cat'] in categories) \
+                and all(t in ex['tags'] for t in tags):
+            hits.append(i)
+    return hits
+
+
+def run(quick=False):
+    results = []
+    for n in (QUICK_SIZES if quick else SIZES):
+        catalog = synthetic_catalog(n, seed=n)
+        index = app.SearchIndex(catalog)
+        index.search("ovemen")  # builds the trigram table once
+        row = {"catalog_size": n,
+               "build_ms": round(timeit(lambda: app.SearchIndex(catalog), repeat=1 if n >= 100_000 else 3), 1),
+               "postings": len(index.docs)}
+        for name, query in QUERIES.items():
+            row[f"{name}_ms"] = round(timeit(lambda: index.search(query), repeat=7), 3)
+        row["faceted_ms"] = round(timeit(lambda: index.search(FACETED["query"], FACETED["categories"], FACETED["tags"]), repeat=7), 3)
+        row["legacy_scan_ms"] = round(timeit(lambda: legacy_search(catalog, "upp"), repeat=1 if n >= 100_000 else 3), 1)
+        results.append(row)
+    return {"search": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
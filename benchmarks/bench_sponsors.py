@@ -0,0 +1,47 @@
+"""Sponsor matching for the shopping list: per-keyword substring scan vs SponsorMatcher.
+
+    python benchmarks/bench_sponsors.py [--quick]
+
+tests/test_sponsors.py checks the matcher against the same scan.
+"""
+import json
+import random
+import sys
+
+from common import app, timeit
+
+WORDS = ["Oats", "Protein", "Powder", "Chia", "Seeds", "Almond", "Milk", "Blueberries", "Spinach", "Banana",
+         "Vanilla", "Coconut", "Water", "Quinoa", "Chickpeas", "Avocado", "Lemon", "Dressing", "Cucumber",
+         "Lentils", "Carrots", "Turmeric", "Vegetable", "Broth", "Rolled", "Frozen", "Red", "Green", "Greek", "Yogurt"]
+
+
+def synthetic_table(n_sponsors, n_items, seed=0):
+    rng = random.Random(seed)
+    keywords = list(dict.fromkeys(
+        " ".join(rng.sample(WORDS, rng.randint(1, 2))) + ("" if k < n_sponsors // 2 else f" {k}")
+        for k in range(n_sponsors * 2)))[:n_sponsors]
+    items = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(n_items)]
+    return keywords, items
+
+
+def run(quick=False):
+    keywords, items = synthetic_table(1_000, 500)
+    matcher = app.SponsorMatcher(keywords)
+
+    naive = [[k for k in keywords if k in item] for item in items]
+
+    naive_ms = timeit(lambda: [[k for k in keywords if k in item] for item in items], repeat=3 if quick else 7)
+    matcher_ms = timeit(lambda: [matcher.matches(item) for item in items], repeat=3 if quick else 7)
+    return {"sponsors": {
+        "sponsors": len(keywords),
+        "items": len(items),
+        "items_with_match": sum(1 for m in naive if m),
+        "build_ms": round(timeit(lambda: app.SponsorMatcher(keywords), repeat=3), 2),
+        "naive_ms": round(naive_ms, 2),
+        "matcher_ms": round(matcher_ms, 2),
+        "speedup": round(naive_ms / matcher_ms, 1),
+    }}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
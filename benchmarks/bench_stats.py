@@ -0,0 +1,73 @@
+"""Stats page with 100k logged workouts: raw-history chart vs incremental rollups.
+
+    python benchmarks/bench_stats.py [--quick]
+
+"legacy" replays the old render (DataFrame from every history dict, one bar
+per row); "rollups" drives the real page through AppTest against a seeded
+SQLite store, once per visible range.
+"""
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import DEMO_USER, app, app_test, payload_bytes
+
+LEGACY_SCRIPT = """
+import datetime, random
+import pandas as pd
+import streamlit as st
+rng = random.Random(0)
+start = datetime.date.today() - datetime.timedelta(days=3650)
+history = [{"date": start + datetime.timedelta(days=rng.randrange(3650)), "minutes": rng.randint(5, 60)} for _ in range(N)]
+t = __import__("time").perf_counter()
+df = pd.DataFrame(history).rename(columns={"date": "Date", "minutes": "Minutes"})
+st.bar_chart(df, x="Date", y="Minutes")
+st.session_state.render_ms = (__import__("time").perf_counter() - t) * 1000
+"""
+
+
+def seed_store(path, n):
+    store = app.SQLiteUserStore(path, batch_size=5_000)
+    rng = random.Random(0)
+    start = datetime.date.today() - datetime.timedelta(days=3650)
+    days = sorted(start + datetime.timedelta(days=rng.randrange(3650)) for _ in range(n))
+    t = time.perf_counter()
+    for day in days:
+        store.log_workout(DEMO_USER["id"], day, rng.randint(5, 60))
+    store.flush()
+    return (time.perf_counter() - t) * 1e6 / n
+
+
+def run(quick=False):
+    n = 10_000 if quick else 100_000
+    from streamlit.testing.v1 import AppTest
+
+    legacy = AppTest.from_string(LEGACY_SCRIPT.replace("N)", f"{n})"), default_timeout=120)
+    legacy.run()
+    results = {"entries": n, "legacy": {"render_ms": round(legacy.session_state.render_ms, 1),
+                                        "payload_bytes": payload_bytes(legacy)}}
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.environ["FITBOD_DATA_DIR"] = data_dir
+        try:
+            results["append_us_per_workout"] = round(seed_store(os.path.join(data_dir, "fitbod.db"), n), 1)
+            at = app_test(user=DEMO_USER, page="stats")
+            at.run()
+            for span in app.AppConfig.STATS_RANGES:
+                at.radio[0].set_value(span)
+                t = time.perf_counter()
+                at.run()
+                assert not at.exception, at.exception
+                results[f"rollups[{span}]"] = {"page_ms": round((time.perf_counter() - t) * 1000, 1),
+                                               "payload_bytes": payload_bytes(at)}
+        finally:
+            os.environ.pop("FITBOD_DATA_DIR", None)
+    return {"stats": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
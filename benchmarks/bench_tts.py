@@ -0,0 +1,43 @@
+"""`AccessibilityManager.get_audio_player` on the offline stub synthesizer: cache miss vs hit.
+
+    python benchmarks/bench_tts.py [--quick]
+"""
+import itertools
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from common import app, timeit
+
+
+def run(quick=False):
+    manager, config = app.AccessibilityManager, app.AppConfig
+    texts = [text for ex in app.DataRepository.EXERCISES for text in manager.spoken_texts(ex)]
+    saved = config.CACHE_DIR, config.TTS_ENGINE
+    with tempfile.TemporaryDirectory() as cache_dir:
+        config.CACHE_DIR, config.TTS_ENGINE = Path(cache_dir), "stub"
+        manager.tts_cache.clear()
+        try:
+            # A fresh text on every call is always a miss (synthesize + write)
+            fresh = (f"{texts[0]} ({k})" for k in itertools.count())
+            miss_ms = timeit(lambda: manager.get_audio_player(next(fresh)), repeat=5, number=10)
+            for text in texts:
+                manager.get_audio_player(text)
+            hit_ms = timeit(lambda: [manager.get_audio_player(t) for t in texts],
+                            repeat=5 if quick else 15) / len(texts)
+            player_bytes = len(manager.get_audio_player(texts[0]).encode())
+            stats = manager.tts_cache().stats()
+        finally:
+            config.CACHE_DIR, config.TTS_ENGINE = saved
+            manager.tts_cache.clear()
+    return {"tts": {
+        "miss_ms": round(miss_ms, 4),
+        "hit_ms": round(hit_ms, 4),
+        "player_bytes": player_bytes,
+        "hit_rate": stats["hit_rate"],
+    }}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
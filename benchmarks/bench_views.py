@@ -0,0 +1,82 @@
+"""Server-side render time and payload of each page, driven through AppTest.
+
+    python benchmarks/bench_views.py [--quick]
+
+Runs app.py against a throwaway data/cache directory with the stub TTS engine,
+so no network is touched. The demo user gets a year of seeded workouts first
+so the stats page charts real rollups. AppTest starts every run with empty
+st.cache_resource storage, so each sample includes the per-process warm-up
+(index build, stylesheet compile); compare runs with each other, not with a
+long-lived server.
+"""
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import DEMO_USER, app, app_test, payload_bytes, seeded_run
+
+PAGES = [
+    ("onboarding", {"user": None}),
+    ("home", {"page": "home"}),
+    ("library", {"page": "library"}),
+    ("food", {"page": "food"}),
+    ("stats", {"page": "stats"}),
+    ("partners", {"page": "partners"}),
+    ("settings", {"page": "settings"}),
+]
+
+
+def seed_history(data_dir, days=365, seed=0):
+    rng = random.Random(seed)
+    store = app.SQLiteUserStore(Path(data_dir) / "fitbod.db")
+    today = datetime.date.today()
+    for offset in range(days):
+        if rng.random() < 0.6:
+            store.log_workout(DEMO_USER["id"], today - datetime.timedelta(days=offset), rng.choice([10, 15, 20]))
+    store.flush()
+
+
+def render(session):
+    at = app_test(**session)
+    start = time.perf_counter()
+    seeded_run(at)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert not at.exception, at.exception
+    return elapsed, payload_bytes(at)
+
+
+def run(quick=False):
+    rounds = 3 if quick else 7
+    env = {"FITBOD_TTS_ENGINE": "stub"}
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as cache_dir:
+        env.update(FITBOD_DATA_DIR=data_dir, FITBOD_CACHE_DIR=cache_dir)
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            seed_history(data_dir)
+            for page, session in PAGES:
+                session = {"user": DEMO_USER, **session}
+                render(session)  # first render also fills the on-disk TTS cache
+                samples = [render(session) for _ in range(rounds)]
+                results[page] = {
+                    "render_ms": round(statistics.median(ms for ms, _ in samples), 1),
+                    "payload_bytes": samples[-1][1],
+                }
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return {"views": results}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(quick="--quick" in sys.argv), indent=2))
@@ -0,0 +1,99 @@
+"""Shared helpers for the benchmark scripts: import path, timers, synthetic data."""
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import app  # noqa: E402
+
+# Bare-mode calls (inject_css) and AppTest runs log a warning per element
+for _name in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.deprecation_util",
+              "streamlit.delta_generator"):
+    logging.getLogger(_name).disabled = True
+
+PROFILE_TAGS = ["Wheelchair User", "Bed-Bound", "Hemiplegia", "Stroke Recovery", "Chronic Fatigue",
+                "Sensory Sensitivity", "Autism/ADHD", "Anxiety", "Coordination"]
+BODY_TAGS = ["Upper Body", "Lower Body", "Core", "Back", "Legs", "Grip", "Balance", "Posture",
+             "Cardio", "Strength", "Mobility", "Recovery", "Stress Relief", "Fun", "Arm Strength"]
+CATEGORIES = ["Strength", "Core", "Rehab", "Balance", "Mobility", "Mindfulness", "Cardio"]
+GOALS = ["Mobility", "Strength", "Cardio", "Mental Health"]
+
+
+def synthetic_catalog(n, seed=0, extra_tags=200):
+    """Builds `n` exercise dicts shaped like `DataRepository.EXERCISES`."""
+    rng = random.Random(seed)
+    rare = [f"Tag {k}" for k in range(extra_tags)]
+    catalog = []
+    for i in range(n):
+        tags = rng.sample(PROFILE_TAGS, rng.randint(0, 2)) + rng.sample(BODY_TAGS, rng.randint(1, 3))
+        if rare and rng.random() < 0.3:
+            tags.append(rng.choice(rare))
+        steps = rng.randint(2, 5)
+        catalog.append({
+            "id": f"syn{i}",
+            "title": f"Synthetic Movement {i}",
+            "cat": rng.choice(CATEGORIES),
+            "tags": tags,
+            "mins": rng.choice([2, 3, 5, 8, 10, 15]),
+            "cal": rng.randint(10, 120),
+            "ins": [f"Step {k + 1} of movement {i}." for k in range(steps)],
+        })
+    return catalog
+
+
+def synthetic_profiles(n, seed=0):
+    """Builds `n` onboarding-style profiles."""
+    rng = random.Random(seed)
+    return [{"name": f"user{i}", "disability": rng.sample(PROFILE_TAGS, rng.randint(0, 2)),
+             "goal": rng.choice(GOALS), "exp": "Beginner"} for i in range(n)]
+
+
+DEMO_USER = {"id": "bench", "name": "Bench", "disability": ["Wheelchair User"], "goal": "Strength", "exp": "Beginner"}
+
+
+def app_test(**session):
+    """An AppTest over app.py with `session` pre-seeded into st.session_state."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    for key, value in session.items():
+        at.session_state[key] = value
+    return at
+
+
+def seeded_run(at, seed=0):
+    """`at.run()` with the global `random` reseeded first.
+
+    The app draws its quote and plan from the module-level generator, so
+    without this the page content, and its payload size, differ per run.
+    """
+    random.seed(seed)
+    return at.run()
+
+
+def payload_bytes(at):
+    """Serialized size of every element/block proto in the last AppTest run."""
+    total, stack = 0, [at._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, "proto", None)
+        if proto is not None and hasattr(proto, "ByteSize"):
+            total += proto.ByteSize()
+        stack.extend(getattr(node, "children", {}).values())
+    return total
+
+
+def timeit(fn, repeat=5, number=1):
+    """Median wall time of `fn()` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return statistics.median(samples)
@@ -0,0 +1,185 @@
+"""Runs the benchmark suite and compares it with a stored baseline.
+
+    python benchmarks/run.py [--quick] [--only engine,css,...] [--out FILE]
+                             [--baseline FILE] [--tolerance 0.5] [--update-baseline]
+
+Every bench_*.py module listed in SUITES is run in-process with fixed seeds,
+the stub TTS engine and throwaway data directories, so the suite needs no
+network. The merged results are written as JSON (stdout or --out) and each
+metric is checked against the baseline (benchmarks/baseline.json by default):
+
+  *_ms / *_us     regress when slower than baseline by more than --tolerance
+  *_bytes         regress when larger than baseline by more than --size-tolerance
+  *_per_sec       regress when lower than baseline by more than --tolerance
+
+Timings of the legacy reference implementations are reported but not checked.
+Absolute targets a suite reports as `*_within_target` flags (e.g. the
+optimizer's p95 budget) must hold on every run, baseline or not.
+Exits 1 when any metric regresses or any target is missed. Baseline timings are machine-specific:
+refresh them with --update-baseline on the machine that runs the check.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+from common import ROOT  # noqa: E402
+
+SUITES = ["engine", "optimizer", "css", "tts", "views", "images", "batch", "audio_payload", "catalog", "sponsors", "stats", "interactions", "search", "history", "activity"]
+DEFAULT_BASELINE = HERE / "baseline.json"
+TIME_FLOOR_MS = 0.005  # ignore sub-5µs wobble on very fast metrics
+
+
+def run_suites(names, quick=False):
+    results, elapsed = {}, {}
+    for name in names:
+        module = importlib.import_module(f"bench_{name}")
+        start = time.perf_counter()
+        results.update(module.run(quick=quick))
+        elapsed[name] = round(time.perf_counter() - start, 1)
+        print(f"{name}: {elapsed[name]} s", file=sys.stderr)
+    return results, elapsed
+
+
+def metadata(quick):
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+    }
+
+
+def flatten(value, prefix="", bools=False):
+    """{"a.b[size=10].c_ms": 1.0, ...} for every numeric (or, with `bools`, boolean) leaf; list items are labelled by their first field."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key, bools)
+    elif isinstance(value, list):
+        for pos, item in enumerate(value):
+            label = pos
+            if isinstance(item, dict) and item:
+                label = "{}={}".format(*next(iter(item.items())))
+            yield from flatten(item, f"{prefix}[{label}]", bools)
+    elif isinstance(value, bool):
+        if bools:
+            yield prefix, value
+    elif isinstance(value, (int, float)):
+        yield prefix, value
+
+
+def missed_targets(results):
+    """Names of the `*_within_target` flags that are False."""
+    return [metric for metric, ok in flatten(results, bools=True)
+            if metric.rsplit(".", 1)[-1].endswith("_within_target") and not ok]
+
+
+def _kind(metric):
+    if "legacy" in metric:
+        return None
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith(("_ms", "_us")):
+        return "time"
+    if leaf.endswith("_bytes"):
+        return "size"
+    if leaf.endswith("_per_sec"):
+        return "rate"
+    return None
+
+
+def compare(current, baseline, tolerance=0.5, size_tolerance=0.05):
+    """Regressions and improvements as (metric, baseline, current, ratio) tuples."""
+    base = dict(flatten(baseline))
+    regressions, improvements = [], []
+    for metric, now in flatten(current):
+        kind, before = _kind(metric), base.get(metric)
+        if kind is None or not before:
+            continue
+        ratio = now / before
+        if kind == "rate":
+            worse, better = ratio < 1 - tolerance, ratio > 1 + tolerance
+        else:
+            limit = size_tolerance if kind == "size" else tolerance
+            floor = TIME_FLOOR_MS * (1000 if metric.endswith("_us") else 1) if kind == "time" else 0
+            worse = ratio > 1 + limit and now - before > floor
+            better = ratio < 1 / (1 + limit) and before - now > floor
+        if worse:
+            regressions.append((metric, before, now, ratio))
+        elif better:
+            improvements.append((metric, before, now, ratio))
+    return regressions, improvements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer rounds")
+    parser.add_argument("--only", default=",".join(SUITES), help="comma-separated suites (default: all)")
+    parser.add_argument("--out", type=Path, help="write results here instead of stdout")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown (default 0.5)")
+    parser.add_argument("--size-tolerance", type=float, default=0.05, help="allowed relative growth of *_bytes")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(SUITES))
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+
+    results, elapsed = run_suites(names, quick=args.quick)
+    report = {"meta": {**metadata(args.quick), "suite_seconds": elapsed}, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+
+    missed = missed_targets(results)
+    for metric in missed:
+        print(f"   MISSED  {metric}", file=sys.stderr)
+    status = 1 if missed else 0
+    if missed:
+        print(f"FAIL: {len(missed)} target(s) missed", file=sys.stderr)
+
+    if args.update_baseline:
+        # A partial run (--only) refreshes just those suites in an existing baseline
+        if args.baseline.exists() and set(names) != set(SUITES):
+            stored = json.loads(args.baseline.read_text())
+            report = {"meta": {**report["meta"], "suite_seconds": {**stored["meta"].get("suite_seconds", {}), **elapsed}},
+                      "results": {**stored["results"], **results}}
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return status
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+        return status
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions, improvements = compare(results, baseline["results"], args.tolerance, args.size_tolerance)
+    for label, rows in (("improved", improvements), ("REGRESSED", regressions)):
+        for metric, before, now, ratio in rows:
+            print(f"{label:>9}  {metric}: {before:g} -> {now:g} ({ratio:.2f}x)", file=sys.stderr)
+    if regressions:
+        print(f"FAIL: {len(regressions)} metric(s) regressed vs {args.baseline}", file=sys.stderr)
+        return 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""Puts the app and the benchmark helpers (synthetic catalogs, reference implementations) on sys.path."""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "benchmarks"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,43 @@
+"""SearchIndex totals, ranking and facet counts against a linear scan of the catalog."""
+import collections
+
+import pytest
+
+from bench_search import FACETED, legacy_search
+from common import app, synthetic_catalog
+
+CATALOG = synthetic_catalog(1_000, seed=1_000)
+
+
+@pytest.fixture(scope="module")
+def index():
+    return app.SearchIndex(CATALOG)
+
+
+@pytest.mark.parametrize("query, cats, tags", [
+    ("upp", (), ()),
+    ("core str", (), ()),
+    ("", (), ()),
+    (FACETED["query"], FACETED["categories"], FACETED["tags"]),
+])
+def test_totals_match_the_scan(index, query, cats, tags):
+    assert index.search(query, cats, tags)["total"] == len(legacy_search(CATALOG, query, cats, tags))
+
+
+def test_substring_fallback_finds_mid_word_matches(index):
+    result = index.search("ovemen")
+    assert result["total"] == len(legacy_search(CATALOG, "ovemen")) > 0
+
+
+def test_positions_are_matches_and_capped(index):
+    result = index.search("upp", limit=5)
+    assert len(result["positions"]) == 5
+    assert set(result["positions"]) <= set(legacy_search(CATALOG, "upp"))
+
+
+@pytest.mark.parametrize("query", ["upp", ""])  # few matches, and everything (counted by complement)
+def test_facets_count_query_matches_before_filters(index, query):
+    hits = [CATALOG[i] for i in legacy_search(CATALOG, query)]
+    result = index.search(query, ["Core"], ["Balance"])
+    assert result["categories"] == dict(collections.Counter(ex['cat'] for ex in hits))
+    assert result["tags"] == dict(collections.Counter(t for ex in hits for t in dict.fromkeys(ex['tags'])))
@@ -0,0 +1,15 @@
+"""SponsorMatcher against the per-keyword substring scan it replaces."""
+from bench_sponsors import synthetic_table
+from common import app
+
+
+def test_matches_equal_substring_scan():
+    keywords, items = synthetic_table(1_000, 500)
+    matcher = app.SponsorMatcher(keywords)
+    assert [matcher.matches(item) for item in items] == [[k for k in keywords if k in item] for item in items]
+
+
+def test_overlapping_keywords_all_match():
+    matcher = app.SponsorMatcher(["Protein", "Protein Powder", "Powder"])
+    assert matcher.matches("Vanilla Protein Powder") == ["Protein", "Protein Powder", "Powder"]
+    assert matcher.matches("Oats") == []
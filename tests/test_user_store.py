@@ -0,0 +1,121 @@
+"""SQLiteUserStore: incremental activity aggregates against their full recount."""
+import datetime
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+def day(n):
+    return datetime.date(2026, 10, n)
+
+
+def workouts(*days):
+    return [(day(n).isoformat(), 10, None) for n in days]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return app.SQLiteUserStore(tmp_path / "fitbod.db")
+
+
+def assert_matches_rebuild(store, user):
+    incremental = store.streaks(user, TODAY), store.week_totals(user, TODAY), store.day_totals(user, TODAY)
+    store.rebuild_rollups()
+    assert incremental == (store.streaks(user, TODAY), store.week_totals(user, TODAY), store.day_totals(user, TODAY))
+
+
+def test_backdated_import_extends_longest_streak(store):
+    store.log_workout("u", TODAY, 10)
+    store.import_records("u", "workout", workouts(10, 11, 12, 13, 14))
+    assert store.streaks("u", TODAY) == {"current": 1, "longest": 5}
+    assert_matches_rebuild(store, "u")
+
+
+def test_out_of_order_imports_join_one_run(store):
+    for n in (16, 15, 17):
+        store.import_records("u", "workout", workouts(n))
+    assert store.streaks("u", TODAY) == {"current": 3, "longest": 3}
+    assert_matches_rebuild(store, "u")
+
+
+def test_unsorted_chunk_and_backdated_log(store):
+    store.import_records("u", "workout", workouts(17, 15, 16, 12))
+    assert store.streaks("u", TODAY) == {"current": 3, "longest": 3}
+    store.log_workout("u", day(14), 10)  # bridges the gap to 15th
+    store.log_workout("u", day(13), 10)
+    assert store.streaks("u", TODAY) == {"current": 6, "longest": 6}
+    assert_matches_rebuild(store, "u")
+
+
+def test_same_day_workouts_count_once(store):
+    for _ in range(3):
+        store.log_workout("u", TODAY, 10)
+    assert store.streaks("u", TODAY) == {"current": 1, "longest": 1}
+    assert store.day_totals("u", TODAY)["sessions"] == 3
+
+
+def test_hydration_is_per_day(store):
+    store.log_water("u", day(16), 3)
+    store.log_water("u", TODAY)
+    assert store.day_totals("u", TODAY)["cups"] == 1
+    assert store.week_totals("u", TODAY)["cups"] == 4  # Monday 12th to Sunday 18th
+    assert_matches_rebuild(store, "u")
+
+
+def test_purchases_fill_inventory_and_shopping_list(store):
+    recipe = app.DataRepository.recipes()[0]
+    store.add_purchases("u", [recipe])
+    store.add_purchases("u", [recipe])  # INSERT OR IGNORE: owned once
+    assert store.inventory("u") == {recipe['id']}
+    assert store.shopping_count("u") == len(recipe['ing'])
+
+
+def test_recount_runs_after_later_days_in_the_same_batch(store):
+    store.log_workout("u", day(11), 10)
+    store.flush()
+    store.log_workout("u", day(13), 10)
+    store.flush()
+    store.log_workout("u", day(12), 10)  # back-dated: bridges 11 and 13
+    store.log_workout("u", day(14), 10)  # in order, same unflushed batch
+    assert store.streaks("u", day(14)) == {"current": 4, "longest": 4}
+    assert_matches_rebuild(store, "u")
+
+
+def test_failed_replace_restore_keeps_history(store, tmp_path):
+    import pyarrow.parquet as pq
+    store.import_records("u", "workout", workouts(10, 11, 12, 13))
+    archive = tmp_path / "backup.parquet"
+    app.HistoryArchive.export(store, "u", archive, chunk_rows=2)
+    # Overwrite the second row group's pages: the first chunk imports, the second fails to decode
+    group = pq.ParquetFile(archive).metadata.row_group(1)
+    first, last = group.column(0), group.column(group.num_columns - 1)
+    start = first.dictionary_page_offset or first.data_page_offset
+    stop = (last.dictionary_page_offset or last.data_page_offset) + last.total_compressed_size
+    data = bytearray(archive.read_bytes())
+    data[start:stop] = b"\xff" * (stop - start)
+    archive.write_bytes(data)
+    with pytest.raises(OSError):
+        app.HistoryArchive.restore(store, "u", archive, chunk_rows=2, replace=True)
+    assert store.streaks("u", day(13)) == {"current": 4, "longest": 4}
+    assert store.week_totals("u", day(13))["sessions"] == 2  # the 12th and 13th, as before
+
+
+def test_profile_round_trip_and_reset(store):
+    profile = {"id": "p1", "name": "Ada", "disability": ["Hemiplegia"], "goal": "Strength", "exp": "Beginner"}
+    store.save_profile("p1", profile)
+    assert store.profile("p1") == profile
+    assert store.profile("p2") is None
+    store.delete_user("p1")
+    assert store.profile("p1") is None
+
+
+def test_weekly_rollups_include_the_week_start_falls_in(store):
+    store.import_records("u", "workout", workouts(15))  # a Thursday
+    assert store.rollups("u", start=day(15), grain="week") == [(day(12), 10, 1)]
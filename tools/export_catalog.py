@@ -0,0 +1,37 @@
+"""Write the bundled exercise/recipe catalogs as JSONL files.
+
+    python tools/export_catalog.py OUT_DIR
+
+Point FITBOD_CATALOG_DIR at OUT_DIR (after editing or extending the files)
+to have the app load them lazily instead of the in-code lists.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def write_jsonl(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir", type=Path)
+    args = parser.parse_args(argv)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    write_jsonl(args.out_dir / "exercises.jsonl", app.DataRepository.EXERCISES)
+    write_jsonl(args.out_dir / "recipes.jsonl", app.DataRepository.RECIPES)
+    print(f"Wrote {len(app.DataRepository.EXERCISES)} exercises and {len(app.DataRepository.RECIPES)} recipes to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Download the recipe photos into the bundled assets so the app never fetches them.
+
+    python tools/fetch_recipe_images.py [--force] [--size-variants]
+
+Saves each recipe's `img` URL as AppConfig.ASSETS_DIR/recipes/<id>.jpg (skipping
+files that already exist unless --force). The app resizes these locally and
+shows generated artwork for any recipe without a bundled file (or links the
+remote `img` URL when FITBOD_REMOTE_IMAGES=1).
+With --size-variants the thumb/card/hero copies are rendered into the cache too.
+"""
+import argparse
+import sys
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="re-download existing files")
+    parser.add_argument("--size-variants", action="store_true", help="also pre-render every size variant")
+    parser.add_argument("--timeout", type=float, default=20.0)
+    args = parser.parse_args(argv)
+
+    pipeline = app.DataRepository.image_pipeline()
+    pipeline.source_dir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    for recipe in app.DataRepository.recipes():
+        url, target = recipe['img'], pipeline.source_dir / f"{recipe['id']}.jpg"
+        if url.startswith(("http://", "https://")) and (args.force or pipeline.source_file(recipe['id']) is None):
+            try:
+                with urllib.request.urlopen(url, timeout=args.timeout) as response:
+                    data = response.read()
+                tmp = target.with_suffix(".tmp")
+                tmp.write_bytes(data)
+                tmp.replace(target)
+                print(f"{recipe['id']}: {len(data)} bytes -> {target}")
+            except OSError as e:
+                failed += 1
+                print(f"{recipe['id']}: {e}", file=sys.stderr)
+        if args.size_variants:
+            for variant in app.ImagePipeline.VARIANTS:
+                pipeline.variant(recipe['id'], variant, title=recipe['title'])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
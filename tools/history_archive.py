@@ -0,0 +1,52 @@
+"""Export or restore one user's history (workouts, water log, journal) as Parquet.
+
+    python tools/history_archive.py export USER_ID OUT.parquet [--db PATH] [--chunk-rows N]
+    python tools/history_archive.py import USER_ID IN.parquet [--db PATH] [--chunk-rows N] [--replace]
+
+Reads and writes in chunks of --chunk-rows, so multi-year histories move with
+bounded memory. --db defaults to the app's store (FITBOD_DATA_DIR/fitbod.db).
+Import appends to the user's existing history unless --replace is given,
+which first deletes that history (workouts, water log, journal). An import
+that fails partway (a truncated or corrupt file) changes nothing.
+"""
+import argparse
+import sys
+
+import pyarrow as pa
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("user", metavar="USER_ID", help="the profile's id (not its display name)")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--db", type=Path, default=app.AppConfig.DATA_DIR / "fitbod.db")
+    parser.add_argument("--chunk-rows", type=int, default=10_000)
+    parser.add_argument("--replace", action="store_true", help="import: delete the user's history first")
+    args = parser.parse_args(argv)
+
+    store = app.SQLiteUserStore(args.db)
+    if args.action == "export":
+        counts = app.HistoryArchive.export(store, args.user, args.path, chunk_rows=args.chunk_rows)
+    else:
+        if not args.path.exists():
+            parser.error(f"no such file: {args.path}")
+        try:
+            counts = app.HistoryArchive.restore(store, args.user, args.path, chunk_rows=args.chunk_rows,
+                                                replace=args.replace)
+        except (ValueError, OSError, pa.ArrowException) as e:
+            print(f"{args.path}: {e}", file=sys.stderr)
+            return 1
+        store.flush()
+    verb = "Exported" if args.action == "export" else "Imported"
+    print(f"{verb} " + ", ".join(f"{n} {kind}" for kind, n in counts.items()) + f" for {args.user!r} ({args.path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Concurrent-session load test: N simulated users driving app.py in one process.
+
+    python tools/load_test.py [--sessions 1,4,16] [--rounds 2] [--app PATH] [--json]
+
+Each session is a Streamlit AppTest (the script runs through main(), as in a
+server) walking onboarding -> dashboard -> shuffle -> complete workout ->
+nutrition -> purchase -> stats, `--rounds` times after onboarding. All
+sessions of a level start together on their own threads and share one
+process, so the numbers describe a single worker. Reports, per concurrency
+level, journeys and steps per second, p50/p95/p99 latency per step (time
+from the click until the page is rendered, including waiting for other
+sessions), the mean service time per step and resident memory per session.
+
+AppTest swaps process globals on every run, so runs from different
+sessions are serialized rather than overlapped; for a one-core worker
+bound by the GIL this is close to how a server interleaves them. AppTest
+also normally gives every run empty st.cache_* storage and recompiles the
+script; here all runs share one cache storage and one compiled script, like
+a long-lived server process. Data, cache and TTS use throwaway directories
+and the offline stub engine.
+"""
+import argparse
+import gc
+import json
+import os
+import pickle
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STEPS = ["load", "onboarding", "dashboard", "shuffle", "complete", "nutrition", "purchase", "stats"]
+RUN_LOCK = threading.Lock()  # AppTest.run is not safe to overlap across threads
+DISABILITIES = ["Wheelchair User", "Hemiplegia", "Sensory Sensitivity", "General Fitness"]
+GOALS = ["Mobility", "Strength", "Cardio", "Mental Health"]
+
+
+def rss_bytes():
+    """Current resident set size (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def share_process_state():
+    """Make every AppTest run use one cache storage and one compiled script, as a server process does."""
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test
+    storage, scripts = MemoryCacheStorageManager(), ScriptCache()
+    app_test.MemoryCacheStorageManager = lambda: storage
+    # Also keeps threads from parsing the script concurrently (ast.parse is not thread-safe on 3.11)
+    app_test.ScriptCache = lambda: scripts
+
+
+class Session:
+    """One simulated user; `timings` collects (step, latency ms, service ms) samples."""
+
+    def __init__(self, app_path, number):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(str(app_path), default_timeout=120)
+        self.number = number
+        self.timings = []
+
+    def _step(self, name, action):
+        queued = time.perf_counter()
+        with RUN_LOCK:
+            start = time.perf_counter()
+            action()
+            end = time.perf_counter()
+        self.timings.append((name, (end - queued) * 1000, (end - start) * 1000))
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+
+    def _click(self, predicate):
+        return next(b for b in self.at.button if predicate(b.label)).click().run
+
+    def journey(self, rounds):
+        at = self.at
+        self._step("load", at.run)
+        at.text_input[0].input(f"load{self.number}")
+        at.multiselect[0].select(DISABILITIES[self.number % len(DISABILITIES)])
+        at.selectbox[0].select(GOALS[self.number % len(GOALS)])
+        self._step("onboarding", at.button[0].click().run)  # form submit
+        for _ in range(rounds):
+            self._step("dashboard", self._click(lambda label: label == "🏠 Home"))
+            self._step("shuffle", self._click(lambda label: label.startswith("🔄")))
+            self._step("complete", self._click(lambda label: label.startswith("✅")))
+            self._step("nutrition", self._click(lambda label: label == "🥦 Food"))
+            buy = next((b for b in at.button if b.label.startswith("Buy £")), None)
+            if buy is not None:
+                self._step("purchase", buy.click().run)
+            self._step("stats", self._click(lambda label: label == "📊 Stats"))
+
+    def state_bytes(self):
+        state = {key: self.at.session_state[key] for key in ("user", "page", "active_workout", "high_contrast")
+                 if key in self.at.session_state}
+        return len(pickle.dumps(state))
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        value = round(samples[0], 1) if samples else None
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": round(cuts[49], 1), "p95": round(cuts[94], 1), "p99": round(cuts[98], 1)}
+
+
+def run_level(app_path, sessions, rounds, first_number=0):
+    gc.collect()
+    rss_before = rss_bytes()
+    users = [Session(app_path, first_number + i) for i in range(sessions)]
+    barrier, errors = threading.Barrier(sessions), []
+
+    def drive(session):
+        barrier.wait()
+        try:
+            session.journey(rounds)
+        except Exception as e:
+            errors.append(f"session {session.number}: {e}")
+
+    threads = [threading.Thread(target=drive, args=(s,), name=f"session-{s.number}") for s in users]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    # Sessions are still referenced here, so the growth is what they hold
+    rss_growth = rss_bytes() - rss_before
+
+    samples = {step: [] for step in STEPS}
+    service = {step: [] for step in STEPS}
+    for session in users:
+        for step, latency, busy in session.timings:
+            samples[step].append(latency)
+            service[step].append(busy)
+    steps = sum(len(v) for v in samples.values())
+    return {
+        "sessions": sessions,
+        "seconds": round(elapsed, 2),
+        "journeys_per_sec": round((sessions - len(errors)) / elapsed, 2),
+        "steps_per_sec": round(steps / elapsed, 1),
+        "errors": errors,
+        "steps_ms": {step: {"n": len(v), **percentiles(v), "service": round(statistics.mean(service[step]), 1)}
+                     for step, v in samples.items() if v},
+        "rss_per_session_kb": round(max(rss_growth, 0) / sessions / 1024, 1),
+        "session_state_bytes": round(statistics.mean(s.state_bytes() for s in users)),
+    }
+
+
+def run(levels=(1, 4, 16), rounds=2, app_path=None):
+    app_path = Path(app_path or ROOT / "app.py")
+    env = {"FITBOD_TTS_ENGINE": "stub"}
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as cache_dir:
+        env.update(FITBOD_DATA_DIR=data_dir, FITBOD_CACHE_DIR=cache_dir)
+        saved = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        try:
+            share_process_state()
+            # One untimed journey warms the shared caches (index, stylesheets, images)
+            Session(app_path, -1).journey(1)
+            results, number = [], 0
+            for sessions in levels:
+                results.append(run_level(app_path, sessions, rounds, first_number=number))
+                number += sessions
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return {"load": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=2, help="dashboard..stats loops per session")
+    parser.add_argument("--app", type=Path, default=None, help="app script to drive (default: app.py)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    import logging
+    for name in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.deprecation_util"):
+        logging.getLogger(name).disabled = True
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    report = run(levels, args.rounds, args.app)["load"]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for level in report:
+            print(f"{level['sessions']:>3} sessions: {level['journeys_per_sec']} journeys/s, "
+                  f"{level['steps_per_sec']} steps/s, {level['rss_per_session_kb']} KiB RSS/session"
+                  f"{', ' + str(len(level['errors'])) + ' errors' if level['errors'] else ''}")
+            for step, stats in level["steps_ms"].items():
+                print(f"      {step:<11} n={stats['n']:<4} p50 {stats['p50']:>8} ms  p95 {stats['p95']:>8} ms  "
+                      f"p99 {stats['p99']:>8} ms  service {stats['service']:>7} ms")
+            for error in level["errors"]:
+                print(f"      ! {error}", file=sys.stderr)
+    return 1 if any(level["errors"] for level in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Cold-start profile of `import app` with a regression budget.
+
+    python tools/profile_startup.py [--budget-ms N] [--runs N] [--top N] [--json]
+
+Runs `import app` in fresh interpreters, reports the median wall time and the
+per-module cumulative cost of app.py's direct imports (from -X importtime),
+and exits non-zero when the median exceeds the budget or a deferred module
+(pandas, numpy, gtts) is loaded at import. The budget defaults to
+FITBOD_STARTUP_BUDGET_MS or 1000 ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFERRED = ("pandas", "numpy", "gtts")
+DEFAULT_BUDGET_MS = float(os.environ.get("FITBOD_STARTUP_BUDGET_MS", 1000))
+
+PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import app\n"
+    "ms = (time.perf_counter() - t) * 1000\n"
+    f"print(json.dumps({{'ms': ms, 'loaded': [m for m in {DEFERRED!r} if m in sys.modules]}}))\n"
+)
+
+
+def _python(*args):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def cold_import(runs):
+    """Median `import app` time over `runs` fresh interpreters, plus deferred modules seen."""
+    samples, loaded = [], set()
+    for _ in range(runs):
+        out = json.loads(_python("-c", PROBE).stdout.strip().splitlines()[-1])
+        samples.append(out["ms"])
+        loaded.update(out["loaded"])
+    return statistics.median(samples), sorted(loaded)
+
+
+def import_profile():
+    """{module: cumulative ms} for every module app.py imports directly."""
+    err = _python("-X", "importtime", "-c", "import app").stderr
+    pending, children = {}, {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        indent = len(name) - len(name.lstrip(" "))
+        module = name.strip()
+        # importtime prints children (deeper indent) before their parent
+        children[module] = pending.pop(indent + 2, [])
+        pending.setdefault(indent, []).append((module, int(cumulative) / 1000))
+    return dict(sorted(children.get("app", []), key=lambda kv: -kv[1]))
+
+
+def run(quick=False, budget_ms=DEFAULT_BUDGET_MS, top=15, runs=None):
+    median_ms, loaded = cold_import(runs or (3 if quick else 7))
+    profile = import_profile()
+    return {"startup": {
+        "cold_import_ms": round(median_ms, 1),
+        "budget_ms": budget_ms,
+        "deferred_loaded": loaded,
+        "ok": median_ms <= budget_ms and not loaded,
+        "modules_ms": {m: round(ms, 2) for m, ms in list(profile.items())[:top]},
+    }}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=None, help="fresh interpreters to sample (default 7)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(budget_ms=args.budget_ms, top=args.top, runs=args.runs)["startup"]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"cold import app: {report['cold_import_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        for module, ms in report["modules_ms"].items():
+            print(f"  {ms:9.2f} ms  {module}")
+        if report["deferred_loaded"]:
+            print(f"deferred modules loaded at startup: {', '.join(report['deferred_loaded'])}")
+    if not report["ok"]:
+        print("FAIL: startup budget exceeded", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Pre-warm the on-disk TTS cache for every exercise title and instruction step in the catalog.
+
+    python tools/warm_tts_cache.py [--engine gtts|stub] [--lang en]
+
+Uses the same cache directory and keys as the app (see AppConfig.CACHE_DIR),
+so cards render without a synthesis round-trip on first view. Clips are
+synthesized concurrently on the app's prefetch pool (AppConfig.TTS_PREFETCH_WORKERS).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", default=app.AppConfig.TTS_ENGINE, choices=sorted(app.AccessibilityManager.SYNTHESIZERS))
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args(argv)
+
+    prefetcher = app.AccessibilityManager.prefetcher(args.engine)
+    texts = dict.fromkeys(text for ex in app.DataRepository.exercises()
+                          for text in app.AccessibilityManager.spoken_texts(ex))
+    futures = {text: prefetcher.submit(text, args.lang) for text in texts}
+    failed = 0
+    for text, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            failed += 1
+            print(f"{text!r}: {e}", file=sys.stderr)
+
+    print(json.dumps(prefetcher.cache.stats(), indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())